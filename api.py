@@ -0,0 +1,205 @@
+# Headless HTTP inference server. Uses the same schemas and feature
+# preparation as the Streamlit pages but does not need the Streamlit runtime.
+# With CDD_METRICS=1, stage timings are served in Prometheus format on /metrics,
+# next to the input drift gauges; GET /drift returns the full drift report.
+#
+#   python api.py --port 8000
+#   curl -X POST localhost:8000/predict/heart -d '{"age": 63, "sex": 1, ...}'
+import argparse
+import json
+import logging
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+import drift
+import hot_reload
+import instrumentation
+from batcher import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS, MicroBatcher
+from model_registry import get_model
+from prediction_cache import cache_stats, cached_predict_proba
+from schemas import MODELS
+from scoring import SchemaError, predict_proba, prepare_features, risk_fields
+from screening import screen
+
+logger = logging.getLogger(__name__)
+
+ROUTES = {f"/predict/{disease.replace('_', '-')}": disease for disease in MODELS}
+
+# One patient record in, one risk report per disease out.
+SCREEN_ROUTE = "/screen"
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+def predict_records(disease, payload, batcher=None):
+    records = payload if isinstance(payload, list) else [payload]
+    if not records or not all(isinstance(record, dict) for record in records):
+        raise SchemaError("Expected a JSON object or a non-empty array of objects")
+
+    with instrumentation.timed("input_assembly", disease):
+        features = prepare_features(disease, pd.DataFrame.from_records(records))
+    with instrumentation.timed("predict_proba", disease):
+        if len(features) == 1:
+            # Cache misses from concurrent clients are coalesced into one predict_proba.
+            predict = (lambda row: batcher.predict(disease, row)) if batcher is not None else None
+            proba = [cached_predict_proba(disease, features.to_dict("records")[0], predict)]
+        else:
+            proba = predict_proba(disease, features, batcher.pool if batcher is not None else None)
+    results = [risk_fields(disease, value) for value in proba]
+    return results if isinstance(payload, list) else results[0]
+
+
+def screen_patient(payload, batcher=None):
+    if not isinstance(payload, dict):
+        raise SchemaError("Expected a JSON object with the patient's fields")
+    return {"results": screen(payload, batcher=batcher)}
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/health":
+            body = {"status": "ok", "models": list(ROUTES), "cache": cache_stats()}
+            if self.server.watcher is not None:
+                body["reloads"] = self.server.watcher.stats()
+            self._send_json(200, body)
+        elif self.path == "/metrics" and (instrumentation.ENABLED or drift.ENABLED):
+            text = (instrumentation.render_prometheus() if instrumentation.ENABLED else "") + drift.render_prometheus()
+            self._send(200, text.encode(), "text/plain; version=0.0.4")
+        elif self.path == "/drift":
+            self._send_json(200, drift.report())
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        disease = ROUTES.get(self.path)
+        if disease is None and self.path != SCREEN_ROUTE:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        length = self._content_length()
+        if length is None:
+            return
+
+        start = time.perf_counter()
+        try:
+            payload = json.loads(self.rfile.read(length) or b"null")
+            if disease is None:
+                result = screen_patient(payload, self.server.batcher)
+            else:
+                result = predict_records(disease, payload, self.server.batcher)
+        except json.JSONDecodeError as exc:
+            self._send_json(400, {"error": f"Invalid JSON: {exc}"})
+            return
+        except SchemaError as exc:
+            self._send_json(400, {"error": str(exc)})
+            return
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        if isinstance(result, list):
+            self._send_json(200, {"results": result, "latency_ms": latency_ms})
+        else:
+            self._send_json(200, {**result, "latency_ms": latency_ms})
+
+    def _content_length(self):
+        # The body size, or None after answering a missing, malformed or
+        # oversized Content-Length. The body is left unread then, so the
+        # connection is closed rather than reused.
+        header = self.headers.get("Content-Length")
+        if header is None:
+            status, error = 411, "Content-Length required"
+        elif not header.strip().isdigit():
+            status, error = 400, f"Invalid Content-Length {header!r}"
+        elif int(header) > MAX_BODY_BYTES:
+            status, error = 413, "Request body too large"
+        else:
+            return int(header)
+        self.close_connection = True
+        self._send_json(status, {"error": error})
+        return None
+
+    def _send_json(self, status, body):
+        self._send(status, json.dumps(body).encode(), "application/json")
+
+    def _send(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the disease models over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--lazy", action="store_true", help="load each model on its first request instead of at startup")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_MAX_BATCH_SIZE,
+        help="max single-row requests merged into one predict_proba call (1 disables micro-batching)",
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=DEFAULT_MAX_WAIT_MS,
+        help="longest a queued request waits for its batch to fill",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="inference processes sharing the loaded models (1 scores in the server process)",
+    )
+    parser.add_argument(
+        "--reload-interval",
+        type=float,
+        default=hot_reload.DEFAULT_INTERVAL,
+        help="seconds between checks for new model artifacts (0 disables hot reload; off with --workers)",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    pool = None
+    if args.workers > 1:
+        from worker_pool import WorkerPool
+
+        # Started before the server threads so the workers fork from a quiet process.
+        pool = WorkerPool(args.workers)
+        logger.info("Started %d inference workers", pool.workers)
+    elif not args.lazy:
+        for disease in MODELS:
+            get_model(disease)
+
+    server = ThreadingHTTPServer((args.host, args.port), PredictionHandler)
+    server.daemon_threads = True
+    server.watcher = None
+    if args.reload_interval > 0 and pool is not None:
+        # Workers keep the models they forked with; swapping the registry's
+        # model would pair their scores with the new model's calibration.
+        logger.warning("Hot reload is off with --workers; restart the server after publishing new models")
+    elif args.reload_interval > 0:
+        server.watcher = hot_reload.start(args.reload_interval)
+    server.batcher = MicroBatcher(args.batch_size, args.max_wait_ms, pool) if args.batch_size > 1 or pool else None
+    logger.info("Serving %s on http://%s:%d", ", ".join([*ROUTES, SCREEN_ROUTE]), args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if server.batcher is not None:
+            server.batcher.close()
+        if pool is not None:
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
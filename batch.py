@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+import drift
+from schemas import MODELS
+from scoring import SchemaError, score_frame
+
+DEFAULT_CHUNKSIZE = 10_000
+
+# Written next to the output after every chunk so an interrupted run can --resume.
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+
+def iter_scored_chunks(disease, source, chunksize=DEFAULT_CHUNKSIZE, pool=None, skip_rows=0):
+    # Each chunk is scored with a single vectorized predict_proba call, or
+    # split across the worker pool's processes when one is given. Only one
+    # chunk is in memory at a time; the first skip_rows data rows are parsed
+    # and dropped without being kept.
+    skiprows = (lambda i: 0 < i <= skip_rows) if skip_rows else None
+    for chunk in pd.read_csv(source, chunksize=chunksize, skiprows=skiprows):
+        if skip_rows:
+            chunk.index += skip_rows
+        yield score_frame(disease, chunk, pool)
+
+
+def iter_csv(disease, source, chunksize=DEFAULT_CHUNKSIZE, pool=None, skip_rows=0):
+    header = skip_rows == 0
+    for scored in iter_scored_chunks(disease, source, chunksize, pool, skip_rows):
+        yield scored.to_csv(index=False, header=header)
+        header = False
+
+
+def score_csv(disease, source, dest, chunksize=DEFAULT_CHUNKSIZE, pool=None, skip_rows=0, on_chunk=None):
+    # Returns the number of data rows in dest, skipped ones included.
+    # on_chunk(rows) runs after each chunk is written.
+    rows = skip_rows
+    header = skip_rows == 0
+    for scored in iter_scored_chunks(disease, source, chunksize, pool, skip_rows):
+        dest.write(scored.to_csv(index=False, header=header))
+        header = False
+        rows += len(scored)
+        if on_chunk is not None:
+            on_chunk(rows)
+    return rows
+
+
+def read_checkpoint(output):
+    try:
+        with open(output + CHECKPOINT_SUFFIX) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(output, state):
+    path = output + CHECKPOINT_SUFFIX
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV of patients with one of the disease models.")
+    parser.add_argument("disease", choices=list(MODELS))
+    parser.add_argument("input", help="input CSV path, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output CSV path, or - for stdout")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--workers", type=int, default=1, help="inference processes (1 scores in this process)")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run from its checkpoint")
+    parser.add_argument("--progress", action="store_true", help="report progress on stderr")
+    args = parser.parse_args(argv)
+
+    # A sorted or single-cohort file differs from the training data by
+    # design, so the live-traffic monitor would warn on every run; use
+    # `python drift.py compare` to check a file. Forked workers inherit this.
+    drift.ENABLED = False
+    to_file = args.output != "-"
+    state = {"disease": args.disease, "input": os.path.abspath(args.input), "rows": 0, "bytes": 0}
+    if args.resume:
+        if not to_file or args.input == "-":
+            parser.error("--resume needs an input file and an --output file")
+        saved = read_checkpoint(args.output)
+        if saved is not None:
+            if (saved["disease"], saved["input"]) != (state["disease"], state["input"]):
+                parser.error(f"{args.output}{CHECKPOINT_SUFFIX} belongs to a {saved['disease']} run on {saved['input']}")
+            state = saved
+            # Drop anything written after the last completed chunk.
+            with open(args.output, "r+b") as f:
+                f.truncate(state["bytes"])
+
+    pool = None
+    if args.workers > 1:
+        from worker_pool import WorkerPool
+
+        pool = WorkerPool(args.workers, [args.disease])
+    source = sys.stdin if args.input == "-" else open(args.input, "rb")
+    total_bytes = os.fstat(source.fileno()).st_size if source is not sys.stdin else 0
+    if not to_file:
+        dest = sys.stdout
+    else:
+        dest = open(args.output, "a" if state["rows"] else "w", newline="")
+    start = time.perf_counter()
+
+    def on_chunk(rows):
+        if to_file:
+            dest.flush()
+            os.fsync(dest.fileno())
+            write_checkpoint(args.output, {**state, "rows": rows, "bytes": dest.tell()})
+        if args.progress:
+            done = rows - state["rows"]
+            rate = done / max(time.perf_counter() - start, 1e-9)
+            percent = f" {source.tell() / total_bytes:6.1%}" if total_bytes else ""
+            print(f"\r{rows:>12,} rows{percent} {rate:>10,.0f} rows/s", end="", file=sys.stderr, flush=True)
+
+    try:
+        score_csv(args.disease, source, dest, args.chunksize, pool, state["rows"], on_chunk)
+    except SchemaError as exc:
+        parser.exit(2, f"error: {exc}\n")
+    finally:
+        if args.progress:
+            print(file=sys.stderr)
+        if source is not sys.stdin:
+            source.close()
+        if dest is not sys.stdout:
+            dest.close()
+        if pool is not None:
+            pool.close()
+    if to_file and os.path.exists(args.output + CHECKPOINT_SUFFIX):
+        os.remove(args.output + CHECKPOINT_SUFFIX)
+
+
+if __name__ == "__main__":
+    main()
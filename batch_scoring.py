@@ -0,0 +1,44 @@
+import streamlit as st
+
+from batch import iter_scored_chunks
+from schemas import MODELS, input_columns
+from scoring import SchemaError
+
+
+def show():
+    st.title("📄 Batch Risk Scoring")
+    st.markdown("Upload a CSV export to score every patient in it with one of the disease models.")
+
+    disease = st.selectbox("Model", options=list(MODELS), format_func=lambda key: MODELS[key]["label"])
+    st.caption("Required columns: " + ", ".join(input_columns(disease)))
+
+    uploaded = st.file_uploader("Patient CSV", type=["csv"])
+
+    if uploaded is not None and st.button("Score File"):
+        progress = st.progress(0)
+        parts = []
+        rows = 0
+        high_risk = 0
+        try:
+            for scored in iter_scored_chunks(disease, uploaded):
+                parts.append(scored.to_csv(index=False, header=not parts))
+                rows += len(scored)
+                high_risk += int(scored["high_risk"].sum())
+                progress.progress(min(uploaded.tell() / max(uploaded.size, 1), 1.0))
+        except SchemaError as exc:
+            st.error(str(exc))
+            return
+
+        progress.progress(1.0)
+        st.metric(label="Patients scored", value=rows)
+        st.metric(label="High risk", value=high_risk)
+        st.download_button(
+            "Download Results",
+            data="".join(parts),
+            file_name=f"{disease}_scores.csv",
+            mime="text/csv",
+        )
+
+
+if __name__ == "__main__":
+    show()
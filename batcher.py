@@ -0,0 +1,103 @@
+# Micro-batching scheduler for single-row predictions. Concurrent callers
+# queue prepared feature rows per disease; a worker thread per disease
+# flushes them as one predict_proba call when the batch is full or the
+# oldest request has waited max_wait_ms, then resolves each caller's future.
+# Given a worker_pool.WorkerPool, batches are handed to its processes without
+# waiting, so several batches can be scoring at once.
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from fast_path import get_predictor
+from schemas import MODELS
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+
+_STOP = object()
+
+
+class MicroBatcher:
+    def __init__(self, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS, pool=None):
+        self.max_batch_size = max_batch_size
+        self.pool = pool
+        self.max_wait = max_wait_ms / 1000
+        self._queues = {disease: queue.SimpleQueue() for disease in MODELS}
+        self._workers = [
+            threading.Thread(target=self._run, args=(disease,), name=f"batcher-{disease}", daemon=True)
+            for disease in MODELS
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, disease, row):
+        # row is one prepared feature vector in MODELS[disease]["features"] order.
+        future = Future()
+        self._queues[disease].put((row, future))
+        return future
+
+    def predict(self, disease, row, timeout=None):
+        return self.submit(disease, row).result(timeout)
+
+    def close(self):
+        for q in self._queues.values():
+            q.put(_STOP)
+        for worker in self._workers:
+            worker.join()
+
+    def _run(self, disease):
+        q = self._queues[disease]
+        while True:
+            item = q.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = q.get(timeout=remaining) if remaining > 0 else q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._flush(disease, batch)
+            if stop:
+                return
+
+    def _flush(self, disease, batch):
+        live = [(row, future) for row, future in batch if future.set_running_or_notify_cancel()]
+        if not live:
+            return
+        rows, futures = zip(*live)
+        X = np.vstack(rows)
+        if self.pool is None:
+            _resolve(futures, lambda: get_predictor(disease).predict(X))
+            return
+        try:
+            task = self.pool.submit(disease, X)
+        except Exception as exc:
+            _resolve(futures, lambda: _raise(exc))
+            return
+        task.add_done_callback(lambda task: _resolve(futures, task.result))
+
+
+def _raise(exc):
+    raise exc
+
+
+def _resolve(futures, compute):
+    try:
+        proba = compute()
+    except Exception as exc:
+        for future in futures:
+            future.set_exception(exc)
+        return
+    for future, value in zip(futures, proba):
+        future.set_result(float(value))
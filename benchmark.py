@@ -0,0 +1,179 @@
+# Benchmark harness for the four best_*_model.pkl models. For each model it
+# measures unpickle time, cold and warm single-row latency (building the
+# one-row DataFrame the way the pages' show() functions did), the same
+# single-row latency through fast_path.FastPredictor, and batch throughput
+# on the bundled data/*.csv rows tiled up to --rows.
+#
+#   python benchmark.py -o bench.json
+#   python benchmark.py --baseline bench_baseline.json   # exit 1 on regression
+#   python benchmark.py --save-baseline bench_baseline.json
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from fast_path import FastPredictor
+from kidney_encoding import encode_kidney_record
+from schemas import MODELS
+from training_data import load_dataset, load_frame
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_BATCH_SIZES = [1, 100, 10_000, 1_000_000]
+DEFAULT_TOLERANCE = 0.2
+
+# Metrics where a smaller number is better; everything else is throughput.
+LOWER_IS_BETTER = ("_ms",)
+
+
+def _time_ms(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def page_record(disease, record):
+    # The input dict a page's show() builds.
+    return encode_kidney_record(record) if disease == "kidney" else record
+
+
+def page_frame(disease, record):
+    # The one-row DataFrame the pages used to hand to predict_proba.
+    return pd.DataFrame([page_record(disease, record)])
+
+
+def tiled(X, rows):
+    repeats = -(-rows // len(X))
+    return pd.DataFrame(np.tile(X.to_numpy(), (repeats, 1))[:rows], columns=X.columns)
+
+
+def bench_model(disease, rows, batch_sizes, single_repeat):
+    path = MODELS[disease]["path"]
+    features = MODELS[disease]["features"]
+    # Complete rows only, as a page always sends every input.
+    records = load_frame(disease)[features].dropna().to_dict("records")
+
+    unpickle = [_time_ms(lambda: joblib.load(path)) for _ in range(5)]
+    model = joblib.load(path)
+
+    result = {"unpickle_ms": statistics.median(unpickle)}
+    result["cold_single_ms"] = _time_ms(lambda: model.predict_proba(page_frame(disease, records[0]))[0][1])
+
+    warm = [
+        _time_ms(lambda: model.predict_proba(page_frame(disease, records[i % len(records)]))[0][1])
+        for i in range(single_repeat)
+    ]
+    result["warm_single_p50_ms"] = float(np.percentile(warm, 50))
+    result["warm_single_p99_ms"] = float(np.percentile(warm, 99))
+
+    predictor = FastPredictor(disease, model)
+    fast = [
+        _time_ms(lambda: predictor.predict_one(page_record(disease, records[i % len(records)])))
+        for i in range(single_repeat)
+    ]
+    result["fast_single_p50_ms"] = float(np.percentile(fast, 50))
+    result["fast_single_p99_ms"] = float(np.percentile(fast, 99))
+
+    X = load_dataset(disease)[0]
+    workload = tiled(X, rows)
+    for size in batch_sizes:
+        if size > rows:
+            continue
+        batch = workload.iloc[:size]
+        repeat = max(1, min(20, 100_000 // size))
+        elapsed = min(_time_ms(lambda: model.predict_proba(batch)) for _ in range(repeat))
+        result[f"batch_{size}_rows_per_s"] = size / (elapsed / 1000)
+    return result
+
+
+def run(diseases, rows=DEFAULT_ROWS, batch_sizes=DEFAULT_BATCH_SIZES, single_repeat=200):
+    import sklearn
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "rows": rows,
+        },
+        "models": {},
+    }
+    for disease in diseases:
+        report["models"][disease] = bench_model(disease, rows, batch_sizes, single_repeat)
+    return report
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    # Returns (disease, metric, baseline, current, change) for every metric
+    # that got worse by more than tolerance (a fraction, e.g. 0.2 = 20%).
+    regressions = []
+    for disease, metrics in report["models"].items():
+        for metric, value in metrics.items():
+            old = baseline.get("models", {}).get(disease, {}).get(metric)
+            if not old:
+                continue
+            change = value / old - 1
+            worse = change > tolerance if metric.endswith(LOWER_IS_BETTER) else change < -tolerance
+            if worse:
+                regressions.append((disease, metric, old, value, change))
+    return regressions
+
+
+def print_report(report):
+    for disease, metrics in report["models"].items():
+        print(f"\n{MODELS[disease]['label']}")
+        for metric, value in metrics.items():
+            print(f"  {metric:<28} {value:>14,.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark model load and inference speed.")
+    parser.add_argument("diseases", nargs="*", help=f"any of {', '.join(MODELS)} (defaults to all four)")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="rows to tile the datasets up to")
+    parser.add_argument(
+        "--batch-sizes",
+        type=lambda text: [int(size) for size in text.split(",")],
+        default=DEFAULT_BATCH_SIZES,
+        help="comma-separated batch sizes",
+    )
+    parser.add_argument("--repeat", type=int, default=200, help="warm single-row calls per model")
+    parser.add_argument("-o", "--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="compare against this saved report")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown before flagging")
+    parser.add_argument("--save-baseline", help="write the report as the new baseline")
+    args = parser.parse_args(argv)
+
+    unknown = [disease for disease in args.diseases if disease not in MODELS]
+    if unknown:
+        parser.error(f"unknown disease(s): {', '.join(unknown)}")
+
+    report = run(args.diseases or list(MODELS), args.rows, args.batch_sizes, args.repeat)
+    print_report(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for disease, metric, old, new, change in regressions:
+            print(f"REGRESSION {disease}.{metric}: {old:,.3f} -> {new:,.3f} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,11 @@
 import streamlit as st
-import pandas as pd
-import joblib
-
-# Load the breast cancer model
-@st.cache_resource
-def load_model():
-    return joblib.load("best_breast_cancer_model.pkl")
-
-model = load_model()
+from explain import show_drivers
+from instrumentation import timed
+from prediction_cache import cached_predict_proba
+from scoring import risk_fields
+import what_if
 
+@st.cache_data(show_spinner=False)
 def show_recommendations(high_risk: bool):
     if high_risk:
         st.markdown('<div class="rec-box high-risk">', unsafe_allow_html=True)
@@ -104,37 +101,51 @@ def show():
     st.title("🎗️ Breast Cancer Risk Predictor")
     st.markdown("Enter the following medical information to get your estimated risk of breast cancer.")
 
-    mean_radius = st.number_input("Mean Radius (mm)", min_value=0.0, max_value=50.0, step=0.1)
-    mean_texture = st.number_input("Mean Texture", min_value=0.0, max_value=50.0, step=0.1)
-    mean_perimeter = st.number_input("Mean Perimeter (mm)", min_value=0.0, max_value=200.0, step=0.1)
-    mean_area = st.number_input("Mean Area (mm^2)", min_value=0.0, max_value=3000.0, step=1.0)
-    mean_smoothness = st.number_input("Mean Smoothness", min_value=0.0, max_value=1.0, step=0.0001, format="%.5f")
-
-    if st.button("Load Results"):
-        input_data = pd.DataFrame([{
-            "mean_radius": mean_radius,
-            "mean_texture": mean_texture,
-            "mean_perimeter": mean_perimeter,
-            "mean_area": mean_area,
-            "mean_smoothness": mean_smoothness
-        }])
+    with st.form("breast_cancer_form"):
+        mean_radius = st.number_input("Mean Radius (mm)", min_value=0.0, max_value=50.0, step=0.1)
+        mean_texture = st.number_input("Mean Texture", min_value=0.0, max_value=50.0, step=0.1)
+        mean_perimeter = st.number_input("Mean Perimeter (mm)", min_value=0.0, max_value=200.0, step=0.1)
+        mean_area = st.number_input("Mean Area (mm^2)", min_value=0.0, max_value=3000.0, step=1.0)
+        mean_smoothness = st.number_input("Mean Smoothness", min_value=0.0, max_value=1.0, step=0.0001, format="%.5f")
+        submitted = st.form_submit_button("Load Results")
+
+    if submitted:
+        with timed("input_assembly", "breast_cancer"):
+            input_data = {
+                "mean_radius": mean_radius,
+                "mean_texture": mean_texture,
+                "mean_perimeter": mean_perimeter,
+                "mean_area": mean_area,
+                "mean_smoothness": mean_smoothness
+            }
 
         # Predict using model
-        prediction_proba = model.predict_proba(input_data)[0][1]
-        prediction_score = int(prediction_proba * 100)
-        high_risk = prediction_score >= 75
+        with timed("predict_proba", "breast_cancer"):
+            prediction_proba = cached_predict_proba("breast_cancer", input_data)
+        st.session_state.setdefault("results", {})["breast_cancer"] = (input_data, risk_fields("breast_cancer", prediction_proba))
+
+    # Shown from session state, so reruns that don't submit the form skip scoring
+    if "breast_cancer" in st.session_state.get("results", {}):
+        input_data, risk = st.session_state["results"]["breast_cancer"]
+        prediction_score = risk["risk_score"]
+        high_risk = risk["high_risk"]
 
         # Results
         st.markdown("### Breast Cancer Risk Score:")
         st.metric(label="Score", value=f"{prediction_score}%")
         st.progress(prediction_score)
+        with timed("explain", "breast_cancer"):
+            show_drivers("breast_cancer", input_data)
 
         if high_risk:
             st.markdown("<h4 style='color: red; text-align:center;'>Patient at <strong>high risk</strong> for breast cancer.</h4>", unsafe_allow_html=True)
         else:
             st.markdown("<h4 style='color: green; text-align:center;'>Patient at <strong>low to medium risk</strong> for breast cancer.</h4>", unsafe_allow_html=True)
 
-        show_recommendations(high_risk)
+        with timed("recommendations", "breast_cancer"):
+            show_recommendations(high_risk)
+
+        what_if.show("breast_cancer", input_data)
 
 
 
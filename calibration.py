@@ -0,0 +1,200 @@
+# Probability calibration and per-disease high-risk cutoffs. Training fits a
+# small monotone map from each winner's predict_proba to calibrated risk on
+# the holdout split: Platt scaling (a sigmoid of the logit) for the small
+# holdouts here, isotonic regression (interpolated knots) once there are
+# enough rows. The high-risk cutoff is then chosen on the same holdout: of
+# the cutoffs that flag at least --sensitivity of its positive cases, the
+# one with the best Youden's J (sensitivity + specificity - 1), the lower
+# one on ties, placed halfway to the next lower holdout score. It is never
+# set above MAX_THRESHOLD, so a calibrated risk over 50% always counts as
+# high.
+#
+# Maps are kept in calibration.json keyed by the artifact's SHA-256, so a
+# model never picks up another model's map; a model without one keeps the raw
+# probability and the HIGH_RISK_THRESHOLD cutoff. Applying a map is one
+# expit or np.interp call.
+#
+#   python calibration.py                      # calibrate the published models
+#   python calibration.py heart --sensitivity 0.95
+#   python calibration.py kidney --threshold 0.6
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+from scipy.special import expit
+
+import model_registry
+from schemas import HIGH_RISK_THRESHOLD, MODELS
+
+CALIBRATION_PATH = "calibration.json"
+DEFAULT_SENSITIVITY = 0.9
+# Holdouts with at least this many rows get isotonic maps; smaller ones
+# would overfit them and get Platt scaling instead.
+MIN_ISOTONIC_ROWS = 1000
+PROBA_CLIP = 1e-6
+MAX_THRESHOLD = 0.5
+
+
+def _logit(proba):
+    proba = np.clip(proba, PROBA_CLIP, 1 - PROBA_CLIP)
+    return np.log(proba) - np.log1p(-proba)
+
+
+class Calibration:
+    def __init__(self, method="identity", params=None, threshold=HIGH_RISK_THRESHOLD / 100):
+        self.method = method
+        self.params = params or {}
+        self.threshold = threshold
+        if method == "isotonic":
+            self._x = np.asarray(self.params["x"], dtype=np.float64)
+            self._y = np.asarray(self.params["y"], dtype=np.float64)
+
+    def apply(self, proba):
+        # Calibrated probabilities for a probability or an array of them.
+        if self.method == "platt":
+            return expit(self.params["a"] * _logit(proba) + self.params["b"])
+        if self.method == "isotonic":
+            return np.interp(proba, self._x, self._y)
+        return proba
+
+    def to_dict(self):
+        return {"method": self.method, "params": self.params, "threshold": self.threshold}
+
+
+IDENTITY = Calibration()
+
+
+def fit(proba, y, method="auto"):
+    # Calibration fitted to holdout probabilities proba with labels y.
+    from sklearn.isotonic import IsotonicRegression
+    from sklearn.linear_model import LogisticRegression
+
+    if method == "auto":
+        method = "isotonic" if len(y) >= MIN_ISOTONIC_ROWS else "platt"
+    if method == "platt":
+        platt = LogisticRegression().fit(_logit(proba)[:, None], y)
+        return Calibration("platt", {"a": float(platt.coef_[0, 0]), "b": float(platt.intercept_[0])})
+    isotonic = IsotonicRegression(out_of_bounds="clip", y_min=0, y_max=1).fit(proba, y)
+    return Calibration("isotonic", {"x": isotonic.X_thresholds_.tolist(), "y": isotonic.y_thresholds_.tolist()})
+
+
+def tune_threshold(calibrated, y, sensitivity):
+    # Cutoff with the best Youden's J among those flagging at least
+    # `sensitivity` of the positive cases; see the header.
+    positive = y == 1
+    if not positive.any() or positive.all():
+        return HIGH_RISK_THRESHOLD / 100
+    # Candidate cutoffs ascending; each flags every score at or above it.
+    scores = np.unique(calibrated)
+    caught = positive.sum() - np.searchsorted(np.sort(calibrated[positive]), scores)
+    cleared = np.searchsorted(np.sort(calibrated[~positive]), scores)
+    youden = caught / positive.sum() + cleared / (~positive).sum() - 1
+    youden[caught < max(np.ceil(sensitivity * positive.sum()), 1)] = -np.inf
+    # argmax takes the first maximum, i.e. the lowest of tied cutoffs.
+    best = int(np.argmax(youden))
+    cutoff = (scores[best] + scores[best - 1]) / 2 if best else scores[best]
+    return float(min(cutoff, MAX_THRESHOLD))
+
+
+def evaluate(calibrated, y, threshold):
+    flagged = calibrated >= threshold
+    return {
+        "sensitivity": float(flagged[y == 1].mean()) if (y == 1).any() else None,
+        "specificity": float((~flagged[y == 0]).mean()) if (y == 0).any() else None,
+        "brier": float(np.mean((calibrated - y) ** 2)),
+    }
+
+
+def calibrate(disease, model, sensitivity=DEFAULT_SENSITIVITY, method="auto", threshold=None):
+    # (Calibration, holdout report) for model on disease's train.py holdout split.
+    from fast_path import FastPredictor
+    from training_data import load_split
+
+    _, X_test, _, y_test = load_split(disease)
+    y = y_test.to_numpy()
+    proba = FastPredictor(disease, model).predict(X_test.to_numpy())
+    calibration = fit(proba, y, method)
+    calibrated = calibration.apply(proba)
+    calibration.threshold = threshold if threshold is not None else tune_threshold(calibrated, y, sensitivity)
+    report = {
+        "rows": len(y),
+        "target_sensitivity": sensitivity if threshold is None else None,
+        "raw_brier": float(np.mean((proba - y) ** 2)),
+        **evaluate(calibrated, y, calibration.threshold),
+    }
+    return calibration, report
+
+
+def read_maps(path=CALIBRATION_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_maps(entries, keep=(), path=CALIBRATION_PATH):
+    # Adds {sha256: entry} to the file, dropping maps for artifacts other than
+    # the new ones and those in keep.
+    maps = {digest: entry for digest, entry in read_maps(path).items() if digest in keep}
+    maps.update(entries)
+    with open(path + ".tmp", "w") as f:
+        json.dump(maps, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+_maps = None
+_lock = threading.Lock()
+
+
+def get_calibration(disease):
+    # The map for the loaded model's artifact, or the identity.
+    global _maps
+    if _maps is None:
+        with _lock:
+            if _maps is None:
+                _maps = {digest: Calibration(**entry["calibration"]) for digest, entry in read_maps().items()}
+    return _maps.get(model_registry.fingerprint(disease), IDENTITY)
+
+
+def invalidate():
+    # Re-read calibration.json on next use.
+    global _maps
+    _maps = None
+
+
+def calibrated_proba(disease, proba):
+    return get_calibration(disease).apply(proba)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate the published models and tune their high-risk cutoffs.")
+    parser.add_argument("diseases", nargs="*", help=f"any of {', '.join(MODELS)} (defaults to all four)")
+    parser.add_argument("--sensitivity", type=float, default=DEFAULT_SENSITIVITY, help="share of holdout positives to flag")
+    parser.add_argument("--threshold", type=float, help="fixed calibrated cutoff instead of a sensitivity target")
+    parser.add_argument("--method", choices=["auto", "platt", "isotonic"], default="auto")
+    args = parser.parse_args(argv)
+
+    unknown = [disease for disease in args.diseases if disease not in MODELS]
+    if unknown:
+        parser.error(f"unknown disease(s): {', '.join(unknown)}")
+
+    entries = {}
+    for disease in args.diseases or MODELS:
+        calibration, report = calibrate(
+            disease, model_registry.get_model(disease), args.sensitivity, args.method, args.threshold
+        )
+        entries[model_registry.fingerprint(disease)] = {"disease": disease, "calibration": calibration.to_dict(), "holdout": report}
+        print(
+            f"{disease:<15} {calibration.method:<9} cutoff {calibration.threshold:.3f}  "
+            f"sensitivity {report['sensitivity']:.3f}  specificity {report['specificity']:.3f}  "
+            f"brier {report['raw_brier']:.4f} -> {report['brier']:.4f}"
+        )
+    write_maps(entries, keep={model_registry.fingerprint(disease) for disease in MODELS})
+    print(f"Wrote {CALIBRATION_PATH}")
+
+
+if __name__ == "__main__":
+    main()
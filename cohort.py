@@ -0,0 +1,247 @@
+# Cohort analytics over scored populations. A cohort is one Parquet table
+# with a row per patient: id, age, and per disease the calibrated probability
+# and high-risk flag (null where that disease wasn't scored). It is built
+# from batch.py outputs, matched on an id column, or by scoring a wide
+# patient CSV for every disease its columns cover:
+#
+#   python cohort.py import heart heart_scores.csv -o cohorts/clinic.parquet
+#   python cohort.py build patients.csv -o cohorts/clinic.parquet
+#
+# Loaded cohorts are held as NumPy columns, and every aggregate is a masked
+# np.bincount or one small matrix product, so a million patients aggregate
+# in a few hundred milliseconds. The Cohort Analytics page caches the
+# results per filter choice, so revisiting a filter is instant.
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from calibration import get_calibration
+from schemas import MODELS, input_columns
+from screening import SHARED_FIELDS
+
+COHORTS_DIR = "cohorts"
+ID_COLUMN = "patient_id"
+DEFAULT_CHUNKSIZE = 100_000
+AGE_BANDS = [0, 30, 40, 50, 60, 70, 80, np.inf]
+AGE_BAND_LABELS = ["<30", "30-39", "40-49", "50-59", "60-69", "70-79", "80+"]
+RISK_BINS = 10
+
+# The column each disease's scored CSV holds the patient's age in.
+AGE_COLUMNS = SHARED_FIELDS["age"]
+
+
+def _age_band(age):
+    # Band index per age; -1 where the age is unknown.
+    band = np.searchsorted(AGE_BANDS, np.asarray(age, dtype=np.float64), side="right") - 1
+    return np.where(np.isnan(age), -1, band).astype(np.int8)
+
+
+def empty():
+    return pd.DataFrame({ID_COLUMN: pd.Series(dtype=object), "age": pd.Series(dtype=np.float32)})
+
+
+def from_scored(disease, scored, id_column=ID_COLUMN):
+    # One disease's columns for a batch.py output frame. Without an id column
+    # the row position is the id, so imports of one patient list line up.
+    ids = scored[id_column] if id_column in scored.columns else pd.Series(np.arange(len(scored)))
+    age_column = AGE_COLUMNS.get(disease)
+    age = scored[age_column] if age_column in scored.columns else np.nan
+    return pd.DataFrame({
+        ID_COLUMN: ids.astype(str).to_numpy(),
+        "age": pd.to_numeric(pd.Series(age, index=scored.index), errors="coerce").astype(np.float32).to_numpy(),
+        f"{disease}_probability": scored["probability"].astype(np.float32).to_numpy(),
+        f"{disease}_high_risk": scored["high_risk"].astype("boolean").to_numpy(),
+    })
+
+
+def merge(cohort, part):
+    # Outer join on the id; part's disease columns replace any earlier ones.
+    scores = [col for col in part.columns if col not in (ID_COLUMN, "age")]
+    cohort = cohort.drop(columns=[col for col in scores if col in cohort.columns])
+    merged = cohort.merge(part, on=ID_COLUMN, how="outer", suffixes=("", "_new"))
+    merged["age"] = merged["age"].fillna(merged.pop("age_new")).astype(np.float32)
+    # Patients missing from one side get nulls, not False, for its flags.
+    flags = [col for col in merged.columns if col.endswith("_high_risk")]
+    merged[flags] = merged[flags].astype("boolean")
+    return merged
+
+
+def score_wide(chunk, pool=None):
+    # Scores one chunk of a wide patient CSV for every disease whose inputs
+    # it has (shared fields included); rows missing any of a disease's
+    # inputs are left unscored for it.
+    from scoring import predict_proba, prepare_features
+
+    ids = chunk[ID_COLUMN].astype(str) if ID_COLUMN in chunk.columns else chunk.index.astype(str).to_series(index=chunk.index)
+    age = chunk["age"] if "age" in chunk.columns else pd.Series(np.nan, index=chunk.index)
+    out = pd.DataFrame({ID_COLUMN: ids.to_numpy(), "age": pd.to_numeric(age, errors="coerce").astype(np.float32).to_numpy()})
+    for disease in MODELS:
+        renamed = chunk.rename(columns={
+            field: targets[disease]
+            for field, targets in SHARED_FIELDS.items()
+            if disease in targets and field in chunk.columns and targets[disease] not in chunk.columns
+        })
+        columns = input_columns(disease)
+        if not all(col in renamed.columns for col in columns):
+            continue
+        complete = renamed[columns].notna().all(axis=1).to_numpy()
+        proba = np.full(len(chunk), np.nan, dtype=np.float32)
+        high_risk = pd.array([pd.NA] * len(chunk), dtype="boolean")
+        if complete.any():
+            calibration = get_calibration(disease)
+            scored = calibration.apply(predict_proba(disease, prepare_features(disease, renamed[complete]), pool))
+            proba[complete] = scored
+            high_risk[complete] = scored >= calibration.threshold
+        out[f"{disease}_probability"] = proba
+        out[f"{disease}_high_risk"] = high_risk
+    return out
+
+
+def save(cohort, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    cohort.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+
+
+def read(path):
+    return pd.read_parquet(path) if os.path.exists(path) else empty()
+
+
+class Cohort:
+    # A cohort table as NumPy columns for the aggregations.
+    def __init__(self, table):
+        self.size = len(table)
+        self.age = table["age"].to_numpy(dtype=np.float64, na_value=np.nan)
+        self.age_band = _age_band(self.age)
+        self.diseases = [d for d in MODELS if f"{d}_probability" in table.columns]
+        self.proba = {d: table[f"{d}_probability"].to_numpy(dtype=np.float64, na_value=np.nan) for d in self.diseases}
+        self.scored = {d: ~np.isnan(self.proba[d]) for d in self.diseases}
+        # (patients, diseases) 0/1 high-risk matrix; unscored counts as 0.
+        self.high_risk = np.column_stack([
+            table[f"{d}_high_risk"].to_numpy(dtype=bool, na_value=False) for d in self.diseases
+        ]).astype(np.float32) if self.diseases else np.zeros((self.size, 0), dtype=np.float32)
+
+    @classmethod
+    def load(cls, path):
+        return cls(pd.read_parquet(path))
+
+    def mask(self, age_range=None, high_risk_for=()):
+        # Patients within age_range (inclusive; unknown ages only when no range
+        # is given) who are high risk for every disease in high_risk_for.
+        mask = np.ones(self.size, dtype=bool)
+        if age_range is not None:
+            low, high = age_range
+            mask &= (self.age >= low) & (self.age <= high)
+        for disease in high_risk_for:
+            mask &= self.high_risk[:, self.diseases.index(disease)] > 0
+        return mask
+
+    def summary(self, mask):
+        return pd.DataFrame(
+            {
+                "scored": [int(np.count_nonzero(self.scored[d] & mask)) for d in self.diseases],
+                "high_risk": self.high_risk[mask].sum(axis=0).astype(int),
+                "mean_probability": [
+                    float(self.proba[d][self.scored[d] & mask].mean()) if (self.scored[d] & mask).any() else np.nan
+                    for d in self.diseases
+                ],
+            },
+            index=[MODELS[d]["label"] for d in self.diseases],
+        )
+
+    def risk_distribution(self, mask):
+        # Patients per 10-point probability bin, per disease.
+        columns = {}
+        for d in self.diseases:
+            selected = self.proba[d][self.scored[d] & mask]
+            bins = np.minimum((selected * RISK_BINS).astype(np.intp), RISK_BINS - 1)
+            columns[MODELS[d]["label"]] = np.bincount(bins, minlength=RISK_BINS)
+        labels = [f"{i * 100 // RISK_BINS}-{(i + 1) * 100 // RISK_BINS}%" for i in range(RISK_BINS)]
+        return pd.DataFrame(columns, index=pd.Index(labels, name="probability"))
+
+    def high_risk_by_age(self, mask):
+        known = mask & (self.age_band >= 0)
+        columns = {
+            MODELS[d]["label"]: np.bincount(
+                self.age_band[known], weights=self.high_risk[known, j], minlength=len(AGE_BAND_LABELS)
+            ).astype(int)
+            for j, d in enumerate(self.diseases)
+        }
+        return pd.DataFrame(columns, index=pd.Index(AGE_BAND_LABELS, name="age"))
+
+    def comorbidity(self, mask):
+        # Patients high risk for both the row's and the column's disease; the
+        # diagonal is each disease's own count.
+        selected = self.high_risk[mask]
+        labels = [MODELS[d]["label"] for d in self.diseases]
+        return pd.DataFrame((selected.T @ selected).round().astype(int), index=labels, columns=labels)
+
+    def condition_counts(self, mask):
+        # Patients by how many conditions they are high risk for.
+        counts = np.bincount(self.high_risk[mask].sum(axis=1).astype(np.intp), minlength=len(self.diseases) + 1)
+        return pd.DataFrame({"patients": counts}, index=pd.Index(range(len(counts)), name="high-risk conditions"))
+
+
+def aggregate(cohort, age_range=None, high_risk_for=()):
+    mask = cohort.mask(age_range, high_risk_for)
+    return {
+        "patients": int(np.count_nonzero(mask)),
+        "summary": cohort.summary(mask),
+        "risk_distribution": cohort.risk_distribution(mask),
+        "high_risk_by_age": cohort.high_risk_by_age(mask),
+        "comorbidity": cohort.comorbidity(mask),
+        "condition_counts": cohort.condition_counts(mask),
+    }
+
+
+def main(argv=None):
+    import drift
+    from scoring import SchemaError
+
+    parser = argparse.ArgumentParser(description="Build a cohort table for the Cohort Analytics page.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imports = commands.add_parser("import", help="add a batch.py output for one disease")
+    imports.add_argument("disease", choices=list(MODELS))
+    imports.add_argument("input", help="scored CSV written by batch.py")
+    imports.add_argument("--id-column", default=ID_COLUMN, help="column matching patients across diseases")
+
+    build = commands.add_parser("build", help="score a wide patient CSV for every disease its columns cover")
+    build.add_argument("input", help=f"patient CSV; '{ID_COLUMN}' is used as the id when present")
+    build.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    build.add_argument("--workers", type=int, default=1, help="inference processes (1 scores in this process)")
+
+    for command in (imports, build):
+        command.add_argument("-o", "--output", required=True, help="cohort Parquet file (created or updated)")
+    args = parser.parse_args(argv)
+
+    # Offline files, as in batch.py: `python drift.py compare` checks them.
+    drift.ENABLED = False
+    try:
+        if args.command == "import":
+            part = from_scored(args.disease, pd.read_csv(args.input), args.id_column)
+            cohort = merge(read(args.output), part)
+        else:
+            pool = None
+            if args.workers > 1:
+                from worker_pool import WorkerPool
+
+                pool = WorkerPool(args.workers, list(MODELS))
+            try:
+                parts = [score_wide(chunk, pool) for chunk in pd.read_csv(args.input, chunksize=args.chunksize)]
+            finally:
+                if pool is not None:
+                    pool.close()
+            cohort = pd.concat(parts, ignore_index=True)
+    except SchemaError as exc:
+        parser.exit(2, f"error: {exc}\n")
+    save(cohort, args.output)
+    print(f"{args.output}: {len(cohort):,} patients")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import re
+
+import streamlit as st
+
+from cohort import COHORTS_DIR, Cohort, aggregate, from_scored, merge, read, save
+from schemas import MODELS
+from scoring import SchemaError
+
+AGE_LIMITS = (0, 120)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def load_cohort(path, mtime_ns):
+    # mtime_ns is only part of the cache key, so a rewritten file is reloaded.
+    return Cohort.load(path)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cohort_aggregates(path, mtime_ns, age_range, high_risk_for):
+    return aggregate(load_cohort(path, mtime_ns), age_range, high_risk_for)
+
+
+def add_scored_results():
+    with st.expander("Add scored results"):
+        st.caption("Upload a CSV written by Batch Scoring or batch.py. Patients are matched across diseases on `patient_id`, or on row order when there is none.")
+        with st.form("cohort_import"):
+            name = st.text_input("Cohort", value="clinic")
+            disease = st.selectbox("Model", options=list(MODELS), format_func=lambda key: MODELS[key]["label"])
+            uploaded = st.file_uploader("Scored CSV", type=["csv"])
+            submitted = st.form_submit_button("Add to Cohort")
+        if submitted and uploaded is not None:
+            import pandas as pd
+
+            # A plain file name, so the cohort can't be written outside COHORTS_DIR.
+            if not re.fullmatch(r"[\w-]+", name):
+                st.error("Cohort names may only use letters, digits, '_' and '-'.")
+                return
+            path = os.path.join(COHORTS_DIR, f"{name}.parquet")
+            try:
+                part = from_scored(disease, pd.read_csv(uploaded))
+            except (KeyError, SchemaError) as exc:
+                st.error(f"Not a scored file: {exc}")
+                return
+            save(merge(read(path), part), path)
+            st.success(f"Added {len(part):,} {MODELS[disease]['label']} results to {path}")
+
+
+def show():
+    st.title("📊 Cohort Analytics")
+    st.markdown("Population views over batch-scored patients: risk distributions, high-risk counts by age and overlap between conditions.")
+
+    add_scored_results()
+
+    files = sorted(f for f in os.listdir(COHORTS_DIR) if f.endswith(".parquet")) if os.path.isdir(COHORTS_DIR) else []
+    if not files:
+        st.info(f"No cohorts yet. Add scored results above, or run `python cohort.py build patients.csv -o {COHORTS_DIR}/clinic.parquet`.")
+        return
+
+    path = os.path.join(COHORTS_DIR, st.selectbox("Cohort", options=files))
+    mtime_ns = os.stat(path).st_mtime_ns
+    cohort = load_cohort(path, mtime_ns)
+
+    age_range = st.slider("Age", min_value=AGE_LIMITS[0], max_value=AGE_LIMITS[1], value=AGE_LIMITS)
+    high_risk_for = st.multiselect(
+        "High risk for", options=cohort.diseases, format_func=lambda key: MODELS[key]["label"]
+    )
+    # Unknown ages are only left out once the range is narrowed.
+    results = cohort_aggregates(
+        path, mtime_ns, None if tuple(age_range) == AGE_LIMITS else tuple(age_range), tuple(high_risk_for)
+    )
+
+    st.metric(label="Patients", value=f"{results['patients']:,}", delta=None)
+    st.dataframe(results["summary"])
+
+    st.markdown("### Risk Distribution")
+    st.bar_chart(results["risk_distribution"])
+
+    st.markdown("### High-Risk Patients by Age")
+    st.bar_chart(results["high_risk_by_age"])
+
+    st.markdown("### Comorbidity")
+    left, right = st.columns(2)
+    with left:
+        st.caption("Patients high risk for both conditions")
+        st.dataframe(results["comorbidity"])
+    with right:
+        st.caption("Patients by number of high-risk conditions")
+        st.bar_chart(results["condition_counts"])
+
+
+if __name__ == "__main__":
+    show()
@@ -0,0 +1,204 @@
+# Compact inference forms of the fitted models. They hold only the arrays
+# predict_proba needs (coefficients, or flattened tree nodes), depend on
+# numpy/scipy instead of sklearn, and reproduce the sklearn probabilities
+# exactly. train.py exports the selected model through compact_model(),
+# bundled with its training preprocessing when it has any.
+#
+# Saved with dump_mmap(), the arrays sit uncompressed and aligned in the
+# joblib file, so the registry's joblib.load(mmap_mode="r") maps them instead
+# of copying: replicas on one host share the page cache and load time does not
+# grow with the forest. Convert the bundled models in place with
+#
+#   python compact.py [disease ...]
+import argparse
+import os
+import shutil
+
+import numpy as np
+
+FOREST_CHUNK_ROWS = 4096
+
+
+class CompactModel:
+    def __init__(self, classes, feature_names):
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+
+    def _as_array(self, X):
+        columns = getattr(X, "columns", None)
+        if columns is not None:
+            if list(columns) != list(self.feature_names_in_):
+                raise ValueError(
+                    f"Expected columns {list(self.feature_names_in_)}, got {list(columns)}"
+                )
+            X = X.to_numpy()
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected an array of shape (n, {self.n_features_in_}), got {X.shape}")
+        return X
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+class CompactLinearModel(CompactModel):
+    # Binary logistic regression: p = expit(X @ coef + intercept).
+    def __init__(self, coef, intercept, classes, feature_names):
+        super().__init__(classes, feature_names)
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64).reshape(-1)
+        self.intercept = float(np.ravel(intercept)[0])
+
+    def decision_function(self, X):
+        return self._as_array(X) @ self.coef + self.intercept
+
+    def predict_proba(self, X):
+        from scipy.special import expit
+
+        prob = expit(self.decision_function(X))
+        return np.stack([1 - prob, prob], axis=1)
+
+
+class CompactForest(CompactModel):
+    # All trees of a random forest flattened into shared node arrays. Leaf
+    # nodes point at themselves, so every row can walk every tree in lockstep
+    # for max_depth vectorized steps. children holds [right, left] pairs so
+    # the next node is children[2 * node + (x <= threshold)].
+    def __init__(self, feature, threshold, children, leaf_proba, roots, max_depth, classes, feature_names):
+        super().__init__(classes, feature_names)
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        n_classes = len(forest.classes_)
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left < 0
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            probas.append(tree.value[:, 0, :n_classes])
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.stack([np.concatenate(rights), np.concatenate(lefts)], axis=1).astype(np.intp).ravel(),
+            leaf_proba=np.concatenate(probas).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=forest.classes_,
+            feature_names=forest.feature_names_in_,
+        )
+
+    def apply(self, X):
+        # Leaf index reached in every tree, shape (n_rows, n_trees).
+        # Trees compare float32 inputs against float64 thresholds, as in sklearn.
+        X32 = self._as_array(X).astype(np.float32)
+        flat = X32.ravel()
+        row_base = (np.arange(len(X32), dtype=np.intp) * X32.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (len(X32), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            go_left = flat[row_base + self.feature[node]] <= self.threshold[node]
+            node = self.children[2 * node + go_left]
+        return node
+
+    def predict_proba(self, X):
+        X = self._as_array(X)
+        out = np.empty((len(X), len(self.classes_)))
+        for start in range(0, len(X), FOREST_CHUNK_ROWS):
+            leaves = self.apply(X[start:start + FOREST_CHUNK_ROWS])
+            # Accumulate tree by tree, in order, to match sklearn's float sums.
+            proba = self.leaf_proba[leaves].cumsum(axis=1)[:, -1]
+            out[start:start + FOREST_CHUNK_ROWS] = proba / len(self.roots)
+        return out
+
+
+class CompactPipeline(CompactModel):
+    # Preprocessing fitted in training (a preprocessing.Imputer) in front of
+    # the model, saved and loaded as one artifact.
+    def __init__(self, preprocess, model):
+        super().__init__(model.classes_, preprocess.feature_names_in_)
+        self.preprocess = preprocess
+        self.model = model
+        self.categories_ = preprocess.categories
+
+    def predict_proba(self, X):
+        X = self.preprocess.transform(self._as_array(X))
+        if not isinstance(self.model, CompactModel):
+            import pandas as pd
+
+            X = pd.DataFrame(X, columns=self.feature_names_in_)
+        return self.model.predict_proba(X)
+
+
+def compact_model(model, preprocess=None):
+    # Returns a compact equivalent of model, or model itself when there is
+    # none, behind preprocess when one is given.
+    served = _compact_estimator(model)
+    return CompactPipeline(preprocess, served) if preprocess is not None else served
+
+
+def _compact_estimator(model):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    feature_names = getattr(model, "feature_names_in_", None)
+    if feature_names is None or len(getattr(model, "classes_", [])) != 2:
+        return model
+    if isinstance(model, LogisticRegression):
+        return CompactLinearModel(model.coef_, model.intercept_, model.classes_, feature_names)
+    if isinstance(model, RandomForestClassifier):
+        return CompactForest.from_sklearn(model)
+    return model
+
+
+def dump_mmap(model, path, preprocess=None):
+    # Writes the compact form of model to path atomically, uncompressed so it can be memory-mapped.
+    import joblib
+
+    tmp = f"{path}.tmp"
+    joblib.dump(compact_model(model, preprocess), tmp)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    import joblib
+
+    # Pickle the classes under "compact", not "__main__", when run as a script.
+    import compact
+    from schemas import MODELS
+
+    parser = argparse.ArgumentParser(description="Rewrite the best_*_model.pkl files in the memory-mappable compact form.")
+    parser.add_argument("diseases", nargs="*", help=f"any of {', '.join(MODELS)} (defaults to all four)")
+    args = parser.parse_args(argv)
+
+    unknown = [disease for disease in args.diseases if disease not in MODELS]
+    if unknown:
+        parser.error(f"unknown disease(s): {', '.join(unknown)}")
+
+    for disease in args.diseases or MODELS:
+        path = MODELS[disease]["path"]
+        model = joblib.load(path)
+        if isinstance(model, compact.CompactModel):
+            print(f"{path}: already compact")
+            continue
+        shutil.copy2(path, f"{path}.sklearn")
+        compact.dump_mmap(model, path)
+        print(f"{path}: {type(model).__name__} -> compact form (original kept as {path}.sklearn)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,10 @@
 import streamlit as st
-import pandas as pd
-import joblib
- 
-@st.cache_resource
-def load_model():
-    return joblib.load("best_diabetes_model.pkl")
- 
-model = load_model()
+from explain import show_drivers
+from instrumentation import timed
+from prediction_cache import cached_predict_proba
+from scoring import risk_fields
  
+@st.cache_data(show_spinner=False)
 def show_recommendations(high_risk: bool):
     if high_risk:
         st.markdown('<div class="rec-box high-risk">', unsafe_allow_html=True)
@@ -108,41 +105,53 @@ def show():
  
     st.markdown("Enter the following medical information to get patient's estimated risk of diabetes.")
  
-    age = st.number_input("Age", min_value=0, max_value=120, step=1)
-    pregnancies = st.number_input("Number of Pregnancies", min_value=0, max_value=20, step=1)
-    glucose = st.number_input("Glucose Level", min_value=0, max_value=300, step=1)
-    blood_pressure = st.number_input("Blood Pressure", min_value=0, max_value=200, step=1)
-    skin_thickness = st.number_input("Skin Thickness", min_value=0, max_value=100, step=1)
-    insulin = st.number_input("Insulin Level", min_value=0, max_value=900, step=1)
-    bmi = st.number_input("BMI", min_value=0.0, max_value=50.0, step=0.1)
-    dpf = st.number_input("Diabetes Pedigree Function", min_value=0.0, max_value=2.5, step=0.01)
- 
-    if st.button("Load Results"):
-        input_data = pd.DataFrame([{
-            "Pregnancies": pregnancies,
-            "Glucose": glucose,
-            "BloodPressure": blood_pressure,
-            "SkinThickness": skin_thickness,
-            "Insulin": insulin,
-            "BMI": bmi,
-            "DiabetesPedigreeFunction": dpf,
-            "Age": age
-        }])
- 
-        prediction_proba = model.predict_proba(input_data)[0][1]
-        prediction_score = int(prediction_proba * 100)
-        high_risk = prediction_score >= 75
+    with st.form("diabetes_form"):
+        age = st.number_input("Age", min_value=0, max_value=120, step=1)
+        pregnancies = st.number_input("Number of Pregnancies", min_value=0, max_value=20, step=1)
+        glucose = st.number_input("Glucose Level", min_value=0, max_value=300, step=1)
+        blood_pressure = st.number_input("Blood Pressure", min_value=0, max_value=200, step=1)
+        skin_thickness = st.number_input("Skin Thickness", min_value=0, max_value=100, step=1)
+        insulin = st.number_input("Insulin Level", min_value=0, max_value=900, step=1)
+        bmi = st.number_input("BMI", min_value=0.0, max_value=50.0, step=0.1)
+        dpf = st.number_input("Diabetes Pedigree Function", min_value=0.0, max_value=2.5, step=0.01)
+        submitted = st.form_submit_button("Load Results")
+
+    if submitted:
+        with timed("input_assembly", "diabetes"):
+            input_data = {
+                "Pregnancies": pregnancies,
+                "Glucose": glucose,
+                "BloodPressure": blood_pressure,
+                "SkinThickness": skin_thickness,
+                "Insulin": insulin,
+                "BMI": bmi,
+                "DiabetesPedigreeFunction": dpf,
+                "Age": age
+            }
+
+        with timed("predict_proba", "diabetes"):
+            prediction_proba = cached_predict_proba("diabetes", input_data)
+        st.session_state.setdefault("results", {})["diabetes"] = (input_data, risk_fields("diabetes", prediction_proba))
+
+    # Shown from session state, so reruns that don't submit the form skip scoring
+    if "diabetes" in st.session_state.get("results", {}):
+        input_data, risk = st.session_state["results"]["diabetes"]
+        prediction_score = risk["risk_score"]
+        high_risk = risk["high_risk"]
  
         st.markdown("### Diabetes Risk Score:")
         st.metric(label="Score", value=str(prediction_score) + "%")
         st.progress(prediction_score)
+        with timed("explain", "diabetes"):
+            show_drivers("diabetes", input_data)
  
         if high_risk:
             st.markdown("<h4 style='color: red; text-align:center;'>Patient at <strong>high risk</strong> for diabetes.</h3>", unsafe_allow_html=True)
         else:
             st.markdown("<h4 style='color: green; text-align:center;'>Patient at <strong>low to medium risk</strong> for diabetes.</h3>", unsafe_allow_html=True)
  
-        show_recommendations(high_risk)
+        with timed("recommendations", "diabetes"):
+            show_recommendations(high_risk)
  
 if __name__ == "__main__":
     show()
\ No newline at end of file
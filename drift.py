@@ -0,0 +1,292 @@
+# Input drift monitor. Every row scored for live traffic (pages, screening
+# and the API) is added to streaming per-feature sketches: counts over bins
+# fixed by the reference data (deciles for numeric inputs, one bin per value
+# for coded ones such as the kidney rbc/pc/... fields), how many values fell
+# outside anything the reference held, and a running sum for the mean.
+# Adding a row is a few comparisons against a (features, bins) table, so the
+# cost per request is constant no matter how much traffic has been seen.
+#
+# Reference sketches are built from the training CSVs, as training_data.py
+# loads them, and kept in drift_reference.json. The live sketches cover the
+# last one to two windows of rows. Every CHECK_EVERY rows each input's population
+# stability index (PSI) against the reference is recomputed, and a warning
+# is logged when an input enters the alert band. Set CDD_DRIFT=0 to turn the
+# monitor off; the batch.py and cohort.py CLIs always do, and files are
+# checked with `compare` instead.
+#
+#   python drift.py reference                   # rebuild drift_reference.json
+#   python drift.py compare kidney patients.csv  # one file against the reference
+import argparse
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from schemas import MODELS, input_columns
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("CDD_DRIFT", "1").lower() not in ("0", "false", "no")
+REFERENCE_PATH = "drift_reference.json"
+QUANTILE_BINS = 10
+# Inputs with at most this many distinct reference values get a bin per value.
+MAX_LEVELS = 10
+DEFAULT_WINDOW = 5000
+CHECK_EVERY = 100
+MIN_ROWS = 100
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+# Share of values outside the reference's range (or unseen codes) that alerts.
+OUTSIDE_ALERT = 0.05
+PSI_FLOOR = 1e-4
+# Rows binned per step; bounds the temporary (rows, features, bins) array.
+CHUNK_ROWS = 10_000
+
+
+def feature_reference(values):
+    levels = np.unique(values)
+    if len(levels) <= MAX_LEVELS:
+        edges = (levels[1:] + levels[:-1]) / 2
+    else:
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, QUANTILE_BINS + 1)[1:-1]))
+        levels = None
+    counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+    return {
+        "edges": edges.tolist(),
+        "levels": levels.tolist() if levels is not None else None,
+        "low": float(values.min()),
+        "high": float(values.max()),
+        "proportions": (counts / len(values)).tolist(),
+        "mean": float(values.mean()),
+    }
+
+
+def build_reference(disease):
+    from training_data import load_dataset
+
+    # Observed values only: the imputer's fills would pile up in one bin.
+    X, _ = load_dataset(disease, impute=False)
+    return {
+        "rows": len(X),
+        "features": {feature: feature_reference(X[feature].dropna().to_numpy(dtype=np.float64)) for feature in input_columns(disease)},
+    }
+
+
+def psi(observed, expected):
+    observed = np.maximum(observed, PSI_FLOOR)
+    expected = np.maximum(expected, PSI_FLOOR)
+    return float(np.sum((observed - expected) * np.log(observed / expected)))
+
+
+class DriftMonitor:
+    def __init__(self, disease, reference, window=DEFAULT_WINDOW):
+        self.disease = disease
+        self.window = window
+        self.features = list(reference["features"])
+        specs = [reference["features"][feature] for feature in self.features]
+        self.columns = np.array([MODELS[disease]["features"].index(feature) for feature in self.features])
+        width = max(len(spec["edges"]) for spec in specs)
+        self.bins = width + 1
+        # Padded per-feature tables: +inf edges are never reached and NaN
+        # levels never match, so every feature can be binned in one step.
+        self.edges = np.full((len(specs), width), np.inf)
+        self.levels = np.full((len(specs), self.bins), np.nan)
+        for i, spec in enumerate(specs):
+            self.edges[i, :len(spec["edges"])] = spec["edges"]
+            if spec["levels"] is not None:
+                self.levels[i, :len(spec["levels"])] = spec["levels"]
+        self.categorical = np.array([spec["levels"] is not None for spec in specs])
+        self.low = np.array([spec["low"] for spec in specs])
+        self.high = np.array([spec["high"] for spec in specs])
+        self.expected = [np.asarray(spec["proportions"]) for spec in specs]
+        self.reference_mean = [spec["mean"] for spec in specs]
+        self._rows = np.arange(len(specs))
+        self._offsets = self._rows * self.bins
+        self.rows = 0
+        self.status = dict.fromkeys(self.features, "collecting")
+        self._current = self._empty()
+        self._previous = self._empty()
+        self._lock = threading.Lock()
+
+    def _empty(self):
+        n = len(self.features)
+        return {"rows": 0, "counts": np.zeros((n, self.bins), dtype=np.int64), "outside": np.zeros(n, dtype=np.int64), "sum": np.zeros(n)}
+
+    def observe(self, X):
+        # X holds rows in the model's full feature order.
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(MODELS[self.disease]["features"]))[:, self.columns]
+        if not len(X):
+            return
+        counts = np.zeros(len(self.features) * self.bins, dtype=np.int64)
+        outside = np.zeros(len(self.features), dtype=np.int64)
+        for start in range(0, len(X), CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            bins = (chunk[:, :, None] >= self.edges).sum(axis=2)
+            counts += np.bincount((self._offsets + bins).ravel(), minlength=len(counts))
+            unseen = (chunk < self.low) | (chunk > self.high) | (self.categorical & (chunk != self.levels[self._rows, bins]))
+            outside += unseen.sum(axis=0)
+        total = X.sum(axis=0)
+
+        with self._lock:
+            if self._current["rows"] >= self.window:
+                self._previous, self._current = self._current, self._empty()
+            self._current["rows"] += len(X)
+            self._current["counts"] += counts.reshape(len(self.features), self.bins)
+            self._current["outside"] += outside
+            self._current["sum"] += total
+            checks = self.rows // CHECK_EVERY
+            self.rows += len(X)
+            if self.rows // CHECK_EVERY == checks:
+                return
+            report = self._report()
+            entered = [feature for feature, stats in report["features"].items() if stats["status"] == "alert" and self.status[feature] != "alert"]
+            self.status = {feature: stats["status"] for feature, stats in report["features"].items()}
+        for feature in entered:
+            stats = report["features"][feature]
+            logger.warning(
+                "Input drift on %s '%s': PSI %.2f, %.1f%% of the last %d rows outside the training data",
+                self.disease, feature, stats["psi"], stats["outside_share"] * 100, report["window_rows"],
+            )
+
+    def _report(self):
+        rows = self._current["rows"] + self._previous["rows"]
+        counts = self._current["counts"] + self._previous["counts"]
+        outside = self._current["outside"] + self._previous["outside"]
+        total = self._current["sum"] + self._previous["sum"]
+        features = {}
+        for i, feature in enumerate(self.features):
+            expected = self.expected[i]
+            stats = {"psi": None, "outside_share": None, "mean": None, "reference_mean": self.reference_mean[i]}
+            if rows:
+                stats["psi"] = psi(counts[i, :len(expected)] / rows, expected)
+                stats["outside_share"] = float(outside[i] / rows)
+                stats["mean"] = float(total[i] / rows)
+            if rows < MIN_ROWS:
+                stats["status"] = "collecting"
+            elif stats["psi"] >= PSI_ALERT or stats["outside_share"] >= OUTSIDE_ALERT:
+                stats["status"] = "alert"
+            elif stats["psi"] >= PSI_WARN:
+                stats["status"] = "warn"
+            else:
+                stats["status"] = "ok"
+            features[feature] = stats
+        return {"rows": self.rows, "window_rows": rows, "features": features}
+
+    def report(self):
+        with self._lock:
+            return self._report()
+
+
+def read_reference(path=REFERENCE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+_monitors = None
+_lock = threading.Lock()
+
+
+def monitors():
+    global _monitors
+    if _monitors is None:
+        with _lock:
+            if _monitors is None:
+                _monitors = {disease: DriftMonitor(disease, reference) for disease, reference in read_reference().items()}
+    return _monitors
+
+
+def observe(disease, X):
+    if not ENABLED:
+        return
+    monitor = monitors().get(disease)
+    if monitor is not None:
+        monitor.observe(X)
+
+
+def report():
+    return {disease: monitor.report() for disease, monitor in monitors().items()} if ENABLED else {}
+
+
+def alerts():
+    # {disease: [inputs in the alert band]} for diseases with any.
+    alerting = {disease: [feature for feature, status in monitor.status.items() if status == "alert"] for disease, monitor in monitors().items()} if ENABLED else {}
+    return {disease: features for disease, features in alerting.items() if features}
+
+
+def render_prometheus():
+    lines = [
+        "# HELP cdd_drift_psi Population stability index of each input against the training data.",
+        "# TYPE cdd_drift_psi gauge",
+    ]
+    outside = [
+        "# HELP cdd_drift_outside_ratio Share of recent values outside the training data's range or codes.",
+        "# TYPE cdd_drift_outside_ratio gauge",
+    ]
+    rows = [
+        "# HELP cdd_drift_rows_total Rows seen by the drift monitor.",
+        "# TYPE cdd_drift_rows_total counter",
+    ]
+    for disease, summary in sorted(report().items()):
+        rows.append(f'cdd_drift_rows_total{{disease="{disease}"}} {summary["rows"]}')
+        for feature, stats in summary["features"].items():
+            if stats["status"] == "collecting":
+                continue
+            labels = f'disease="{disease}",feature="{feature}"'
+            lines.append(f"cdd_drift_psi{{{labels}}} {stats['psi']}")
+            outside.append(f"cdd_drift_outside_ratio{{{labels}}} {stats['outside_share']}")
+    return "\n".join(lines + outside + rows) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build drift reference sketches or compare a CSV against them.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("reference", help=f"rebuild {REFERENCE_PATH} from the training CSVs")
+    build.add_argument("diseases", nargs="*", help=f"any of {', '.join(MODELS)} (defaults to all four)")
+    compare = commands.add_parser("compare", help="report drift for a patient CSV")
+    compare.add_argument("disease", choices=list(MODELS))
+    compare.add_argument("input", help="CSV with the disease's input columns")
+    args = parser.parse_args(argv)
+
+    if args.command == "reference":
+        unknown = [disease for disease in args.diseases if disease not in MODELS]
+        if unknown:
+            parser.error(f"unknown disease(s): {', '.join(unknown)}")
+        references = read_reference()
+        for disease in args.diseases or MODELS:
+            references[disease] = build_reference(disease)
+            print(f"{disease:<15} {references[disease]['rows']:>5} rows  {len(references[disease]['features'])} inputs")
+        with open(REFERENCE_PATH + ".tmp", "w") as f:
+            json.dump(references, f, indent=2)
+        os.replace(REFERENCE_PATH + ".tmp", REFERENCE_PATH)
+        print(f"Wrote {REFERENCE_PATH}")
+        return
+
+    import pandas as pd
+
+    from scoring import SchemaError, prepare_features
+
+    reference = read_reference().get(args.disease)
+    if reference is None:
+        parser.exit(2, f"error: no reference for {args.disease}; run `python drift.py reference` first\n")
+    try:
+        features = prepare_features(args.disease, pd.read_csv(args.input))
+    except SchemaError as exc:
+        parser.exit(2, f"error: {exc}\n")
+    monitor = DriftMonitor(args.disease, reference, window=len(features))
+    monitor.observe(features.to_numpy())
+    summary = monitor.report()
+    print(f"{args.disease}: {summary['rows']} rows")
+    for feature, stats in sorted(summary["features"].items(), key=lambda item: -item[1]["psi"]):
+        print(
+            f"  {feature:<25} {stats['status']:<10} PSI {stats['psi']:6.3f}  "
+            f"outside {stats['outside_share'] * 100:5.1f}%  mean {stats['mean']:.3g} (reference {stats['reference_mean']:.3g})"
+        )
+
+
+if __name__ == "__main__":
+    main()
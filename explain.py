@@ -0,0 +1,342 @@
+# Per-prediction feature attributions: how much each input moved a patient's
+# risk away from the average patient in data/*.csv. Contributions are in
+# probability units and add up exactly to probability - base.
+#
+#   forests      exact path-dependent TreeSHAP, with node covers counted by
+#                passing the data/*.csv rows through the trees. Each leaf's
+#                Shapley terms depend only on which of its path's features a
+#                row satisfies, so they are tabulated once per model and rows
+#                are explained with lookups.
+#   linear       closed form: coef * (x - background mean), on the log-odds
+#   XGBoost      the booster's own TreeSHAP (pred_contribs), on the log-odds
+#   anything     mean occlusion: f(x) - f(x with the input set to its mean)
+#
+# Log-odds attributions are rescaled onto the probability, and every model's
+# onto its calibrated probability (calibration.py), so contributions add up
+# to the score the pages show.
+#
+#   python explain.py heart patients.csv -o drivers.csv
+import argparse
+import logging
+import sys
+import threading
+from math import factorial
+
+import numpy as np
+import pandas as pd
+
+from calibration import get_calibration
+from model_registry import get_model
+from schemas import KIDNEY_FIXED_VALUES, MODELS
+
+logger = logging.getLogger(__name__)
+
+TOP_DRIVERS = 3
+# Leaves whose path splits on more distinct features than this would need
+# 2**n-row tables; such forests fall back to occlusion.
+MAX_PATH_FEATURES = 12
+EXPLAIN_CHUNK_ROWS = 256
+
+
+def _rescale(contributions, delta, new_delta, fallback):
+    # Scales each row's contributions from summing to delta to summing to new_delta.
+    slope = np.divide(new_delta, delta, out=np.full_like(delta, fallback), where=np.abs(delta) > 1e-12)
+    return contributions * slope[:, None]
+
+
+def _to_probability(contributions, base_logit, logit):
+    # Rescales log-odds contributions so they sum to expit(logit) - expit(base_logit).
+    from scipy.special import expit
+
+    base = expit(base_logit)
+    return float(base), _rescale(contributions, logit - base_logit, expit(logit) - base, base * (1 - base))
+
+
+class LinearExplainer:
+    def __init__(self, coef, intercept, means):
+        self.coef = np.asarray(coef, dtype=np.float64).reshape(-1)
+        self.intercept = float(np.ravel(intercept)[0])
+        self.means = means
+        self.base_logit = self.intercept + self.coef @ means
+
+    def explain(self, X):
+        contributions = self.coef * (X - self.means)
+        return _to_probability(contributions, self.base_logit, X @ self.coef + self.intercept)
+
+
+class BoosterExplainer:
+    def __init__(self, model, features):
+        self.booster = model.get_booster()
+        self.features = features
+
+    def explain(self, X):
+        from xgboost import DMatrix
+
+        contribs = self.booster.predict(DMatrix(X, feature_names=self.features), pred_contribs=True)
+        base_logit = float(contribs[0, -1])
+        return _to_probability(contribs[:, :-1], base_logit, contribs.sum(axis=1))
+
+
+class OcclusionExplainer:
+    def __init__(self, predict, means):
+        self.predict = predict
+        self.means = means
+
+    def explain(self, X):
+        proba = self.predict(X)
+        contributions = np.empty_like(X)
+        for j, mean in enumerate(self.means):
+            occluded = X.copy()
+            occluded[:, j] = mean
+            contributions[:, j] = proba - self.predict(occluded)
+        return float(self.predict(self.means[None, :])[0]), contributions
+
+
+class PreprocessedExplainer:
+    # For a compact.CompactPipeline: explains its model on the preprocessed
+    # rows, so a filled gap is credited with its fill value and a pinned
+    # input (the kidney id) with nothing.
+    def __init__(self, preprocess, explainer):
+        self.preprocess = preprocess
+        self.explainer = explainer
+
+    def explain(self, X):
+        return self.explainer.explain(self.preprocess.transform(X))
+
+
+def _forest_trees(model):
+    # (feature, threshold, left, right, positive-class value) per tree, leaves
+    # marked by left == -1, for sklearn forests and the compact form.
+    from compact import CompactForest
+
+    if isinstance(model, CompactForest):
+        bounds = list(model.roots) + [len(model.feature)]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            nodes = np.arange(start, end)
+            left = model.children[2 * nodes + 1]
+            leaf = left == nodes
+            yield (
+                model.feature[start:end],
+                model.threshold[start:end],
+                np.where(leaf, -1, left - start),
+                np.where(leaf, -1, model.children[2 * nodes] - start),
+                model.leaf_proba[start:end, 1],
+            )
+        return
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        yield tree.feature, tree.threshold, tree.children_left, tree.children_right, tree.value[:, 0, 1]
+
+
+def _covers(left, right, feature, threshold, X32):
+    # Number of background rows reaching each node.
+    covers = np.zeros(len(left))
+    stack = [(0, np.arange(len(X32)))]
+    while stack:
+        node, rows = stack.pop()
+        covers[node] = len(rows)
+        if left[node] >= 0:
+            go_left = X32[rows, feature[node]] <= threshold[node]
+            stack.append((left[node], rows[go_left]))
+            stack.append((right[node], rows[~go_left]))
+    return covers
+
+
+class TreeExplainer:
+    def __init__(self, model, background):
+        X32 = background.astype(np.float32)
+        n_trees = len(model.roots) if hasattr(model, "roots") else len(model.estimators_)
+        # Leaves grouped by their number of distinct path features d:
+        # d -> lists of (value, path features, lower, upper, zero fractions).
+        groups = {}
+        self.base = 0.0
+        for feature, threshold, left, right, value in _forest_trees(model):
+            covers = _covers(left, right, feature, threshold, X32)
+            stack = [(0, {})]
+            while stack:
+                node, path = stack.pop()
+                if left[node] < 0:
+                    leaf_value = value[node] / n_trees
+                    self.base += leaf_value * np.prod([z for _, _, z in path.values()])
+                    if path:
+                        groups.setdefault(len(path), []).append((leaf_value, path))
+                    continue
+                f = feature[node]
+                lower, upper, zero = path.get(f, (-np.inf, np.inf, 1.0))
+                for child, bounds in ((left[node], (lower, min(upper, threshold[node]))),
+                                      (right[node], (max(lower, threshold[node]), upper))):
+                    ratio = covers[child] / covers[node] if covers[node] else 0.0
+                    stack.append((child, {**path, f: (*bounds, zero * ratio)}))
+
+        if max(groups, default=0) > MAX_PATH_FEATURES:
+            raise ValueError(f"Forest paths split on up to {max(groups)} features (limit {MAX_PATH_FEATURES})")
+        self.n_features = background.shape[1]
+        self.groups = [self._tabulate(d, leaves) for d, leaves in sorted(groups.items())]
+
+    def _tabulate(self, d, leaves):
+        value = np.array([leaf_value for leaf_value, _ in leaves])
+        features = np.array([list(path) for _, path in leaves], dtype=np.intp)
+        lower, upper, zero = (np.array([[entry[k] for entry in path.values()] for _, path in leaves]) for k in range(3))
+
+        # table[leaf, pattern, i]: feature i's Shapley term when pattern's bits
+        # say which path features the row satisfies. With one fractions o and
+        # zero fractions z, it is v * (o_i - z_i) * sum over S of
+        # |S|! (d - |S| - 1)! / d! * prod(o_k, k in S) * prod(z_k, k not in S or i).
+        ones = (np.arange(2 ** d)[:, None] >> np.arange(d) & 1).astype(np.float64)
+        weights = np.array([factorial(s) * factorial(d - s - 1) / factorial(d) for s in range(d)])
+        table = np.empty((len(leaves), 2 ** d, d))
+        for i in range(d):
+            # Coefficients of prod over k != i of (z_k + o_k t), by power of t.
+            poly = np.zeros((len(leaves), 2 ** d, d))
+            poly[..., 0] = 1
+            for k in range(d):
+                if k == i:
+                    continue
+                shifted = np.zeros_like(poly)
+                shifted[..., 1:] = poly[..., :-1] * ones[None, :, k, None]
+                poly = poly * zero[:, None, k, None] + shifted
+            table[..., i] = value[:, None] * (ones[None, :, i] - zero[:, i, None]) * (poly @ weights)
+
+        # Scatters (leaf, slot) terms onto the model's features.
+        scatter = np.zeros((len(leaves) * d, self.n_features))
+        scatter[np.arange(len(leaves) * d), features.ravel()] = 1
+        offsets = np.arange(len(leaves)) * 2 ** d
+        return features, lower, upper, table.reshape(-1, d), offsets, scatter
+
+    def explain(self, X):
+        X32 = X.astype(np.float32)
+        contributions = np.zeros((len(X), self.n_features))
+        for start in range(0, len(X), EXPLAIN_CHUNK_ROWS):
+            rows = X32[start:start + EXPLAIN_CHUNK_ROWS]
+            for features, lower, upper, table, offsets, scatter in self.groups:
+                values = rows[:, features]
+                satisfied = (values > lower) & (values <= upper)
+                index = offsets + satisfied[..., 0]
+                for k in range(1, features.shape[1]):
+                    index += satisfied[..., k].astype(np.intp) << k
+                terms = np.take(table, index, axis=0)
+                contributions[start:start + len(rows)] += terms.reshape(len(rows), -1) @ scatter
+        return self.base, contributions
+
+
+_background = {}
+
+
+def background(disease):
+    # data/*.csv rows in model feature encoding, loaded once per process.
+    if disease not in _background:
+        from training_data import load_dataset
+
+        _background[disease] = load_dataset(disease)[0].to_numpy()
+    return _background[disease]
+
+
+def make_explainer(disease, model):
+    from sklearn.ensemble._forest import ForestClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    from compact import CompactForest, CompactLinearModel, CompactPipeline
+
+    if isinstance(model, CompactPipeline):
+        return PreprocessedExplainer(model.preprocess, make_explainer(disease, model.model))
+    rows = background(disease)
+    means = rows.mean(axis=0)
+    if isinstance(model, CompactLinearModel):
+        return LinearExplainer(model.coef, model.intercept, means)
+    if isinstance(model, LogisticRegression) and len(model.classes_) == 2:
+        return LinearExplainer(model.coef_, model.intercept_, means)
+    if hasattr(model, "get_booster"):
+        return BoosterExplainer(model, MODELS[disease]["features"])
+    if isinstance(model, (CompactForest, ForestClassifier)) and len(model.classes_) == 2:
+        try:
+            return TreeExplainer(model, rows)
+        except ValueError as exc:
+            logger.warning("Explaining the %s model by occlusion: %s", disease, exc)
+    from fast_path import FastPredictor
+
+    return OcclusionExplainer(FastPredictor(disease, model).predict, means)
+
+
+_explainers = {}
+_lock = threading.Lock()
+
+
+def get_explainer(disease):
+    # Rebuilt whenever the registry hands back a different (reloaded) model.
+    model = get_model(disease)
+    entry = _explainers.get(disease)
+    if entry is None or entry[0] is not model:
+        with _lock:
+            entry = _explainers.get(disease)
+            if entry is None or entry[0] is not model:
+                entry = _explainers[disease] = (model, make_explainer(disease, model))
+    return entry[1]
+
+
+def explain(disease, X):
+    # (base probability, (n, n_features) contributions) for a float64 array
+    # of encoded feature rows, on the calibrated scale.
+    base, contributions = get_explainer(disease).explain(np.atleast_2d(np.asarray(X, dtype=np.float64)))
+    calibration = get_calibration(disease)
+    proba = base + contributions.sum(axis=1)
+    calibrated_base = float(calibration.apply(base))
+    return calibrated_base, _rescale(contributions, proba - base, calibration.apply(proba) - calibrated_base, 1.0)
+
+
+def top_drivers(disease, record, n=TOP_DRIVERS, exclude=()):
+    # The n inputs that moved this record's risk most, as (feature, contribution).
+    features = MODELS[disease]["features"]
+    _, contributions = explain(disease, [[record[feature] for feature in features]])
+    order = [j for j in np.argsort(-np.abs(contributions[0])) if features[j] not in exclude]
+    return [(features[j], float(contributions[0, j])) for j in order[:n]]
+
+
+def format_drivers(drivers):
+    return ", ".join(f"{feature} {contribution * 100:+.1f}" for feature, contribution in drivers)
+
+
+def explain_frame(disease, features, n=TOP_DRIVERS):
+    # contrib_<feature> columns in percentage points plus a top_drivers summary
+    # for a frame from scoring.prepare_features.
+    names = MODELS[disease]["features"]
+    _, contributions = explain(disease, features.to_numpy())
+    columns = {f"contrib_{name}": contributions[:, j] * 100 for j, name in enumerate(names)}
+    order = np.argsort(-np.abs(contributions), axis=1)[:, :n]
+    columns["top_drivers"] = [
+        format_drivers((names[j], contributions[row, j]) for j in top) for row, top in enumerate(order)
+    ]
+    return pd.DataFrame(columns, index=features.index)
+
+
+def show_drivers(disease, record):
+    import streamlit as st
+
+    st.markdown("#### Top Drivers")
+    # Inputs the page fills in itself (the kidney id) are not the patient's.
+    for feature, contribution in top_drivers(disease, record, exclude=KIDNEY_FIXED_VALUES):
+        arrow = "▲" if contribution > 0 else "▼"
+        st.markdown(f"{arrow} **{feature}** = {record[feature]:g}: {contribution * 100:+.1f} points")
+    st.caption("Change in risk score from the average patient in the training data.")
+
+
+def main(argv=None):
+    from scoring import SchemaError, prepare_features
+
+    parser = argparse.ArgumentParser(description="Explain each row's risk score with per-feature contributions.")
+    parser.add_argument("disease", choices=list(MODELS))
+    parser.add_argument("input", help="input CSV path, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output CSV path, or - for stdout")
+    parser.add_argument("--top", type=int, default=TOP_DRIVERS, help="drivers listed per row")
+    args = parser.parse_args(argv)
+
+    df = pd.read_csv(sys.stdin if args.input == "-" else args.input)
+    try:
+        features = prepare_features(args.disease, df)
+    except SchemaError as exc:
+        parser.exit(2, f"error: {exc}\n")
+    result = df.join(explain_frame(args.disease, features, args.top))
+    result.to_csv(sys.stdout if args.output == "-" else args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
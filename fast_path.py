@@ -0,0 +1,96 @@
+# Single-row fast path. Each predictor checks the model's feature names once,
+# fills a preallocated per-thread NumPy row from a page's input dict, and
+# calls the estimator's numeric code directly: no DataFrame construction or
+# per-call input validation, with the same probabilities as predict_proba.
+import threading
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from compact import CompactModel
+from model_registry import get_model
+from schemas import MODELS, category_codes
+
+
+class FastPredictor:
+    def __init__(self, disease, model):
+        self.disease = disease
+        self.model = model
+        self.features = MODELS[disease]["features"]
+        names = getattr(model, "feature_names_in_", None)
+        if names is not None and list(names) != self.features:
+            raise ValueError(f"{disease} model expects features {list(names)}, schema has {self.features}")
+        categories = getattr(model, "categories_", None)
+        if categories is not None and categories != category_codes(disease):
+            raise ValueError(f"{disease} model was trained with category codes {categories}, schema has {category_codes(disease)}")
+        self._getter = itemgetter(*self.features)
+        self._local = threading.local()
+        self._predict = self._numeric_path(model)
+
+    def vector(self, record):
+        # Fills and returns this thread's (1, n_features) float64 buffer.
+        buf = getattr(self._local, "buf", None)
+        if buf is None:
+            buf = self._local.buf = np.zeros((1, len(self.features)))
+        try:
+            buf[0] = self._getter(record)
+        except KeyError as exc:
+            raise ValueError(f"Missing feature {exc} for {self.disease}") from None
+        return buf
+
+    def predict(self, X):
+        # Positive-class probabilities for a float64 (n, n_features) array.
+        return self._predict(X)
+
+    def predict_one(self, record):
+        return float(self._predict(self.vector(record))[0])
+
+    def _numeric_path(self, model):
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.linear_model import LogisticRegression
+
+        if isinstance(model, CompactModel):
+            return lambda X: model.predict_proba(X)[:, 1]
+
+        if isinstance(model, LogisticRegression) and len(model.classes_) == 2:
+            from scipy.special import expit
+
+            coef_T = model.coef_.T
+            intercept = model.intercept_
+            # Same arithmetic as LinearClassifierMixin.decision_function + expit.
+            return lambda X: expit((X @ coef_T + intercept).reshape(-1))
+
+        if isinstance(model, RandomForestClassifier) and model.n_outputs_ == 1:
+            trees = [estimator.tree_ for estimator in model.estimators_]
+            n_classes = model.n_classes_
+
+            def forest_proba(X):
+                X32 = np.ascontiguousarray(X, dtype=np.float32)
+                total = np.zeros((len(X32), n_classes))
+                # Summed in estimator order, as ForestClassifier.predict_proba does.
+                for tree in trees:
+                    total += tree.predict(X32)[:, :n_classes]
+                total /= len(trees)
+                return total[:, 1]
+
+            return forest_proba
+
+        features = self.features
+        return lambda X: model.predict_proba(pd.DataFrame(X, columns=features))[:, 1]
+
+
+_predictors = {}
+_lock = threading.Lock()
+
+
+def get_predictor(disease):
+    # Rebuilt whenever the registry hands back a different (reloaded) model.
+    model = get_model(disease)
+    predictor = _predictors.get(disease)
+    if predictor is None or predictor.model is not model:
+        with _lock:
+            predictor = _predictors.get(disease)
+            if predictor is None or predictor.model is not model:
+                predictor = _predictors[disease] = FastPredictor(disease, model)
+    return predictor
@@ -0,0 +1,125 @@
+import streamlit as st
+
+from schemas import (
+    HEART_CP_MAP,
+    HEART_EXNG_MAP,
+    HEART_FBS_MAP,
+    HEART_RESTECG_MAP,
+    HEART_SEX_MAP,
+    HEART_SLP_MAP,
+    HEART_THALL_MAP,
+    MODELS,
+)
+from screening import screen
+
+
+def show():
+    st.title("🩺 Full Screening")
+    st.markdown("Enter the patient's information once to screen for all four conditions. Uncheck a condition to leave it out.")
+
+    include = {}
+    for column, disease in zip(st.columns(len(MODELS)), MODELS):
+        with column:
+            include[disease] = st.checkbox(f"Include {MODELS[disease]['label'].lower()}", value=True)
+    selected = [disease for disease in MODELS if include[disease]]
+
+    with st.form("screening_form"):
+        st.markdown("### Shared Information")
+        patient = {
+            "age": st.number_input("Age", min_value=1, max_value=100, step=1, key="screen_age"),
+            "blood_pressure": st.number_input("Diastolic Blood Pressure (mm Hg)", min_value=0, max_value=200, step=1, key="screen_bp"),
+            "glucose": st.number_input("Glucose Level (mg/dL)", min_value=0, max_value=500, step=1, key="screen_glucose"),
+        }
+
+        if include["diabetes"]:
+            st.markdown("### Diabetes")
+            patient.update({
+                "Pregnancies": st.number_input("Number of Pregnancies", min_value=0, max_value=20, step=1),
+                "SkinThickness": st.number_input("Skin Thickness", min_value=0, max_value=100, step=1),
+                "Insulin": st.number_input("Insulin Level", min_value=0, max_value=900, step=1),
+                "BMI": st.number_input("BMI", min_value=0.0, max_value=50.0, step=0.1),
+                "DiabetesPedigreeFunction": st.number_input("Diabetes Pedigree Function", min_value=0.0, max_value=2.5, step=0.01),
+            })
+
+        if include["kidney"]:
+            st.markdown("### Kidney Disease")
+            patient.update({
+                "sg": st.number_input("Specific Gravity", min_value=1.005, max_value=1.025, step=0.001, format="%.3f"),
+                "al": st.number_input("Albumin", min_value=0, max_value=5, step=1),
+                "su": st.number_input("Sugar", min_value=0, max_value=5, step=1),
+                "bu": st.number_input("Blood Urea (mg/dL)", min_value=1, max_value=300, step=1),
+                "sc": st.number_input("Serum Creatinine (mg/dL)", min_value=0.1, max_value=15.0, step=0.1),
+                "sod": st.number_input("Sodium (mEq/L)", min_value=100, max_value=150, step=1),
+                "pot": st.number_input("Potassium (mEq/L)", min_value=2.5, max_value=7.0, step=0.1),
+                "hemo": st.number_input("Hemoglobin (g/dL)", min_value=3.0, max_value=17.5, step=0.1),
+                "pcv": st.number_input("Packed Cell Volume (%)", min_value=10, max_value=55, step=1),
+                "wc": st.number_input("White Blood Cell Count (/mm³)", min_value=3000, max_value=20000, step=100),
+                "rc": st.number_input("Red Blood Cell Count (millions/μL)", min_value=2.0, max_value=6.5, step=0.1),
+                "rbc": st.selectbox("Red Blood Cells", options=["normal", "abnormal"]),
+                "pc": st.selectbox("Pus Cell", options=["normal", "abnormal"]),
+                "pcc": st.selectbox("Pus Cell Clumps", options=["not present", "present"]),
+                "ba": st.selectbox("Bacteria", options=["not present", "present"]),
+                "htn": st.selectbox("Hypertension", options=["no", "yes"]),
+                "dm": st.selectbox("Diabetes Mellitus", options=["no", "yes"]),
+                "cad": st.selectbox("Coronary Artery Disease", options=["no", "yes"]),
+                "appet": st.selectbox("Appetite", options=["good", "poor"]),
+                "pe": st.selectbox("Pedal Edema", options=["no", "yes"]),
+                "ane": st.selectbox("Anemia", options=["no", "yes"]),
+            })
+
+        if include["heart"]:
+            st.markdown("### Heart Disease")
+            patient.update({
+                "sex": HEART_SEX_MAP[st.selectbox("Sex", options=list(HEART_SEX_MAP.keys()))],
+                "cp": HEART_CP_MAP[st.selectbox("Chest Pain Type", options=list(HEART_CP_MAP.keys()))],
+                "trtbps": st.number_input("Resting Systolic Blood Pressure (mm Hg)", min_value=90, max_value=200, step=1),
+                "chol": st.number_input("Serum Cholesterol (mg/dl)", min_value=100, max_value=600, step=1),
+                "fbs": HEART_FBS_MAP[st.selectbox("Fasting Blood Sugar > 120 mg/dl", options=list(HEART_FBS_MAP.keys()))],
+                "restecg": HEART_RESTECG_MAP[st.selectbox("Resting ECG Results", options=list(HEART_RESTECG_MAP.keys()))],
+                "thalachh": st.number_input("Max Heart Rate Achieved", min_value=60, max_value=220, step=1),
+                "exng": HEART_EXNG_MAP[st.selectbox("Exercise Induced Angina", options=list(HEART_EXNG_MAP.keys()))],
+                "oldpeak": st.number_input("Oldpeak (ST depression by exercise)", min_value=0.0, max_value=6.0, step=0.1),
+                "slp": HEART_SLP_MAP[st.selectbox("Slope of ST Segment", options=list(HEART_SLP_MAP.keys()))],
+                "caa": st.selectbox("Number of Major Vessels Colored by Fluoroscopy", options=[0, 1, 2, 3]),
+                "thall": HEART_THALL_MAP[st.selectbox("Thalassemia", options=list(HEART_THALL_MAP.keys()))],
+            })
+
+        if include["breast_cancer"]:
+            st.markdown("### Breast Cancer")
+            patient.update({
+                "mean_radius": st.number_input("Mean Radius (mm)", min_value=0.0, max_value=50.0, step=0.1),
+                "mean_texture": st.number_input("Mean Texture", min_value=0.0, max_value=50.0, step=0.1),
+                "mean_perimeter": st.number_input("Mean Perimeter (mm)", min_value=0.0, max_value=200.0, step=0.1),
+                "mean_area": st.number_input("Mean Area (mm^2)", min_value=0.0, max_value=3000.0, step=1.0),
+                "mean_smoothness": st.number_input("Mean Smoothness", min_value=0.0, max_value=1.0, step=0.0001, format="%.5f"),
+            })
+        submitted = st.form_submit_button("Screen Patient", disabled=not selected)
+
+    if submitted:
+        st.session_state.setdefault("results", {})["screening"] = screen(patient, selected)
+
+    if "screening" in st.session_state.get("results", {}):
+        report = st.session_state["results"]["screening"]
+
+        st.markdown("### Screening Report")
+        for column, (disease, result) in zip(st.columns(len(report)), report.items()):
+            label = MODELS[disease]["label"]
+            with column:
+                if result["status"] != "scored":
+                    st.metric(label=label, value="—")
+                    st.caption(result.get("error") or "Missing: " + ", ".join(result["missing"]))
+                    continue
+                st.metric(label=label, value=f"{result['risk_score']}%")
+                st.progress(result["risk_score"])
+                if result["high_risk"]:
+                    st.markdown("<p style='color: red;'><strong>High risk</strong></p>", unsafe_allow_html=True)
+                else:
+                    st.markdown("<p style='color: green;'><strong>Low to medium risk</strong></p>", unsafe_allow_html=True)
+
+        flagged = [MODELS[d]["label"] for d, r in report.items() if r.get("high_risk")]
+        if flagged:
+            st.warning(f"High risk: {', '.join(flagged)}. Open the condition's page for its recommendation plan.")
+
+
+if __name__ == "__main__":
+    show()
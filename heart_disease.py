@@ -1,15 +1,21 @@
 import streamlit as st
-import pandas as pd
-import joblib
-
-# Load heart disease model
-@st.cache_resource
-def load_model():
-    return joblib.load("best_heart_disease_model.pkl")
-
-model = load_model()
+from explain import show_drivers
+from instrumentation import timed
+from prediction_cache import cached_predict_proba
+from scoring import risk_fields
+import what_if
+from schemas import (
+    HEART_CP_MAP,
+    HEART_EXNG_MAP,
+    HEART_FBS_MAP,
+    HEART_RESTECG_MAP,
+    HEART_SEX_MAP,
+    HEART_SLP_MAP,
+    HEART_THALL_MAP,
+)
 
 # Recommendation plans
+@st.cache_data(show_spinner=False)
 def show_recommendations(high_risk: bool):
     if high_risk:
         st.markdown('<div class="rec-box high-risk">', unsafe_allow_html=True)
@@ -98,90 +104,83 @@ def show():
 
     st.markdown("Enter the following medical information to get your estimated risk of heart disease.")
 
-    age = st.number_input("Age", min_value=20, max_value=100, step=1)
-
-    sex = st.selectbox("Sex", options=["Female", "Male"])
-    sex = 0 if sex == "Female" else 1
-
-    cp_map = {
-        "Typical angina (0)": 0,
-        "Atypical angina (1)": 1,
-        "Non-anginal pain (2)": 2,
-        "Asymptomatic (3)": 3
-    }
-    cp_label = st.selectbox("Chest Pain Type", options=list(cp_map.keys()))
-    cp = cp_map[cp_label]
-
-    trtbps = st.number_input("Resting Blood Pressure (mm Hg)", min_value=90, max_value=200, step=1)
-    chol = st.number_input("Serum Cholesterol (mg/dl)", min_value=100, max_value=600, step=1)
-
-    fbs = st.selectbox("Fasting Blood Sugar > 120 mg/dl", options=["False (0)", "True (1)"])
-    fbs = 1 if "True" in fbs else 0
-
-    restecg_map = {
-        "Normal (0)": 0,
-        "ST-T wave abnormality (1)": 1,
-        "Left ventricular hypertrophy (2)": 2
-    }
-    restecg_label = st.selectbox("Resting ECG Results", options=list(restecg_map.keys()))
-    restecg = restecg_map[restecg_label]
-
-    thalachh = st.number_input("Max Heart Rate Achieved", min_value=60, max_value=220, step=1)
-
-    exng = st.selectbox("Exercise Induced Angina", options=["No (0)", "Yes (1)"])
-    exng = 1 if "Yes" in exng else 0
-
-    oldpeak = st.number_input("Oldpeak (ST depression by exercise)", min_value=0.0, max_value=6.0, step=0.1)
-
-    slp_map = {
-        "Upsloping (0)": 0,
-        "Flat (1)": 1,
-        "Downsloping (2)": 2
-    }
-    slp_label = st.selectbox("Slope of ST Segment", options=list(slp_map.keys()))
-    slp = slp_map[slp_label]
-
-    caa = st.selectbox("Number of Major Vessels Colored by Fluoroscopy", options=[0, 1, 2, 3])
-
-    thall_map = {
-        "Normal (1)": 1,
-        "Fixed defect (2)": 2,
-        "Reversible defect (3)": 3
-    }
-    thall_label = st.selectbox("Thalassemia", options=list(thall_map.keys()))
-    thall = thall_map[thall_label]
-
-    if st.button("Load Results"):
-        input_data = pd.DataFrame([{
-            "age": age,
-            "sex": sex,
-            "cp": cp,
-            "trtbps": trtbps,
-            "chol": chol,
-            "fbs": fbs,
-            "restecg": restecg,
-            "thalachh": thalachh,
-            "exng": exng,
-            "oldpeak": oldpeak,
-            "slp": slp,
-            "caa": caa,
-            "thall": thall
-        }])
-
-        prediction_proba = model.predict_proba(input_data)[0][1]
-        prediction_score = int(prediction_proba * 100)
-        high_risk = prediction_score >= 75
+    with st.form("heart_form"):
+        age = st.number_input("Age", min_value=20, max_value=100, step=1)
+
+        sex_label = st.selectbox("Sex", options=list(HEART_SEX_MAP.keys()))
+        sex = HEART_SEX_MAP[sex_label]
+
+        cp_label = st.selectbox("Chest Pain Type", options=list(HEART_CP_MAP.keys()))
+        cp = HEART_CP_MAP[cp_label]
+
+        trtbps = st.number_input("Resting Blood Pressure (mm Hg)", min_value=90, max_value=200, step=1)
+        chol = st.number_input("Serum Cholesterol (mg/dl)", min_value=100, max_value=600, step=1)
+
+        fbs_label = st.selectbox("Fasting Blood Sugar > 120 mg/dl", options=list(HEART_FBS_MAP.keys()))
+        fbs = HEART_FBS_MAP[fbs_label]
+
+        restecg_label = st.selectbox("Resting ECG Results", options=list(HEART_RESTECG_MAP.keys()))
+        restecg = HEART_RESTECG_MAP[restecg_label]
+
+        thalachh = st.number_input("Max Heart Rate Achieved", min_value=60, max_value=220, step=1)
+
+        exng_label = st.selectbox("Exercise Induced Angina", options=list(HEART_EXNG_MAP.keys()))
+        exng = HEART_EXNG_MAP[exng_label]
+
+        oldpeak = st.number_input("Oldpeak (ST depression by exercise)", min_value=0.0, max_value=6.0, step=0.1)
+
+        slp_label = st.selectbox("Slope of ST Segment", options=list(HEART_SLP_MAP.keys()))
+        slp = HEART_SLP_MAP[slp_label]
+
+        caa = st.selectbox("Number of Major Vessels Colored by Fluoroscopy", options=[0, 1, 2, 3])
+
+        thall_label = st.selectbox("Thalassemia", options=list(HEART_THALL_MAP.keys()))
+        thall = HEART_THALL_MAP[thall_label]
+        submitted = st.form_submit_button("Load Results")
+
+    if submitted:
+        with timed("input_assembly", "heart"):
+            input_data = {
+                "age": age,
+                "sex": sex,
+                "cp": cp,
+                "trtbps": trtbps,
+                "chol": chol,
+                "fbs": fbs,
+                "restecg": restecg,
+                "thalachh": thalachh,
+                "exng": exng,
+                "oldpeak": oldpeak,
+                "slp": slp,
+                "caa": caa,
+                "thall": thall
+            }
+
+        with timed("predict_proba", "heart"):
+            prediction_proba = cached_predict_proba("heart", input_data)
+        st.session_state.setdefault("results", {})["heart"] = (input_data, risk_fields("heart", prediction_proba))
+
+    # Shown from session state, so reruns that don't submit the form skip scoring
+    if "heart" in st.session_state.get("results", {}):
+        input_data, risk = st.session_state["results"]["heart"]
+        prediction_score = risk["risk_score"]
+        high_risk = risk["high_risk"]
 
         st.markdown("### Heart Disease Risk Score:")
         st.metric(label="Score", value=f"{prediction_score}%")
         st.progress(prediction_score)
+        with timed("explain", "heart"):
+            show_drivers("heart", input_data)
 
         if high_risk:
             st.markdown("<h4 style='color: red; text-align:center;'>Patient at <strong>high risk</strong> for heart disease.</h4>", unsafe_allow_html=True)
         else:
             st.markdown("<h4 style='color: green; text-align:center;'>Patient at <strong>low to medium risk</strong> for heart disease.</h4>", unsafe_allow_html=True)
 
-        show_recommendations(high_risk)
+        with timed("recommendations", "heart"):
+            show_recommendations(high_risk)
+
+        what_if.show("heart", input_data)
 
 # For standalone testing
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+# Zero-downtime model reloads. A daemon thread stat()s each loaded model's
+# artifact every few seconds. When a file changes and its SHA-256 differs
+# from the loaded model's, the new artifact is loaded off the request path,
+# warmed up and smoke-tested against rows from data/*.csv, then installed in
+# the registry with one assignment. Requests already holding the old model
+# finish on it. An artifact that fails the smoke test is logged and ignored
+# until the file changes again. Edits to calibration.json are picked up on
+# the same poll.
+import logging
+import os
+import threading
+
+import numpy as np
+
+import calibration
+import model_registry
+from schemas import MODELS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 2.0
+SMOKE_ROWS = 200
+# Lowest ROC AUC on the smoke rows a new model may have.
+SMOKE_MIN_AUC = 0.7
+
+
+class ModelWatcher:
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.swaps = 0
+        self.rejections = 0
+        self._rejected = {}
+        self._smoke = {}
+        self._calibration_stat = self._stat_calibration()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def check(self):
+        # One polling pass; returns the diseases whose model was swapped.
+        # Calibration maps are keyed by checksum, so re-reading them first
+        # lets a model published together with its map use it right away.
+        stat = self._stat_calibration()
+        if stat != self._calibration_stat:
+            self._calibration_stat = stat
+            calibration.invalidate()
+            logger.info("Reloaded %s", calibration.CALIBRATION_PATH)
+        swapped = []
+        for disease in MODELS:
+            if not model_registry.is_loaded(disease) or not model_registry.artifact_changed(disease):
+                continue
+            try:
+                if self._reload(disease):
+                    swapped.append(disease)
+            except Exception:
+                logger.exception("Keeping the current %s model", disease)
+        return swapped
+
+    def _stat_calibration(self):
+        try:
+            stat = os.stat(calibration.CALIBRATION_PATH)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def _reload(self, disease):
+        stat = model_registry.artifact_stat(disease)
+        if self._rejected.get(disease) == stat:
+            return False
+        model, digest, stat, seconds = model_registry.read_artifact(disease)
+        if digest == model_registry.fingerprint(disease):
+            model_registry.mark_current(disease, stat)
+            return False
+        try:
+            self.validate(disease, model)
+        except Exception:
+            self._rejected[disease] = stat
+            self.rejections += 1
+            raise
+
+        model_registry.install(disease, model, digest, stat, seconds)
+        # Old-fingerprint entries can never be hit again; free them now.
+        from prediction_cache import cache
+
+        cache.invalidate(disease)
+        self.swaps += 1
+        logger.info("Swapped in %s model %s (loaded in %.1f ms)", disease, digest[:12], seconds * 1000)
+        return True
+
+    def validate(self, disease, model):
+        # Scores the smoke rows with the fast path the pages use, which also
+        # builds its caches and pages in a memory-mapped artifact.
+        from fast_path import FastPredictor
+        from sklearn.metrics import roc_auc_score
+
+        X, y = self.smoke_set(disease)
+        proba = FastPredictor(disease, model).predict(X)
+        if proba.shape != (len(X),) or not np.all((proba >= 0) & (proba <= 1)):
+            raise ValueError(f"New {disease} model returned invalid probabilities")
+        auc = roc_auc_score(y, proba)
+        if auc < SMOKE_MIN_AUC:
+            raise ValueError(f"New {disease} model scored ROC AUC {auc:.3f} on the smoke set (minimum {SMOKE_MIN_AUC})")
+
+    def smoke_set(self, disease):
+        if disease not in self._smoke:
+            from training_data import load_dataset
+
+            X, y = load_dataset(disease)
+            rows = np.linspace(0, len(X) - 1, min(SMOKE_ROWS, len(X))).astype(int)
+            self._smoke[disease] = (X.to_numpy()[rows], y.to_numpy()[rows])
+        return self._smoke[disease]
+
+    def stats(self):
+        return {"swaps": self.swaps, "rejections": self.rejections}
+
+
+_watcher = None
+_lock = threading.Lock()
+
+
+def start(interval=DEFAULT_INTERVAL):
+    # Starts the process-wide watcher once; later calls return the same one.
+    global _watcher
+    with _lock:
+        if _watcher is None:
+            _watcher = ModelWatcher(interval).start()
+    return _watcher
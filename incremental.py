@@ -0,0 +1,313 @@
+# Incremental retraining from newly labeled outcomes. Clinics append labeled
+# rows to a per-disease store (labeled/<disease>.csv, kept in model feature
+# encoding); `update` then moves each published model forward from the
+# estimator it was built from instead of rerunning train.py:
+#
+#   XGBoost               extra boosting rounds on the new rows
+#   partial_fit models    partial_fit on the new rows
+#   Random Forest         grows extra trees (warm_start) over all rows
+#   Logistic Regression   warm-started refit from the current coefficients
+#   anything else         left as is until drift is detected
+#
+# Any model is refit from scratch on all rows when the new rows drift from
+# the data it was trained on (feature mean shift, or ROC AUC on the new rows
+# falling). An update that scores worse on the train.py holdout split is
+# rejected; the rest are written as a train.py-style artifact set and, with
+# --publish, swapped in atomically for the app to pick up.
+#
+#   python incremental.py add heart outcomes.csv
+#   python incremental.py update --publish
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+
+from compact import CompactLinearModel, CompactModel, CompactPipeline
+from model_registry import file_digest
+from schemas import KIDNEY_FIXED_VALUES, MODELS
+from scoring import SchemaError, prepare_features
+from train import ARTIFACTS_DIR, candidate_models, publish, write_artifacts
+from training_data import DATASETS, load_split
+
+LABELED_DIR = "labeled"
+STATE_PATH = os.path.join(LABELED_DIR, "state.json")
+
+# Fewer new rows than this are left in the store for the next update.
+MIN_NEW_ROWS = 20
+# Largest shift of a feature's mean, in reference standard deviations.
+DEFAULT_SHIFT_THRESHOLD = 0.5
+# Largest drop in ROC AUC on the new rows relative to the holdout split.
+DEFAULT_AUC_DROP = 0.05
+# Largest holdout ROC AUC loss an update may cause and still be published.
+MAX_AUC_REGRESSION = 0.02
+# Trees added per update, as a fraction of the current forest.
+FOREST_GROWTH = 0.2
+
+# Accepted spellings of the outcome label.
+TARGET_CODES = {
+    "1": 1, "1.0": 1, "true": 1, "yes": 1, "ckd": 1,
+    "0": 0, "0.0": 0, "false": 0, "no": 0, "notckd": 0,
+}
+
+
+def store_path(disease):
+    return os.path.join(LABELED_DIR, f"{disease}.csv")
+
+
+def append_labeled(disease, df):
+    # Validates and encodes df like a batch upload, then appends it to the store.
+    target = DATASETS[disease]["target"]
+    if target not in df.columns:
+        raise SchemaError(f"Missing label column '{target}' for {disease}")
+    labels = df[target].map(lambda value: TARGET_CODES.get(str(value).strip().lower()))
+    if labels.isna().any():
+        values = ", ".join(repr(v) for v in df.loc[labels.isna(), target].unique()[:5])
+        raise SchemaError(f"Unknown label value(s) for '{target}': {values}")
+    rows = prepare_features(disease, df).assign(**{target: labels.astype(int)})
+
+    os.makedirs(LABELED_DIR, exist_ok=True)
+    path = store_path(disease)
+    rows.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+    return len(rows)
+
+
+def load_labeled(disease):
+    features = MODELS[disease]["features"]
+    target = DATASETS[disease]["target"]
+    if not os.path.exists(store_path(disease)):
+        return pd.DataFrame(columns=features, dtype=float), pd.Series(dtype=int, name=target)
+    df = pd.read_csv(store_path(disease))
+    return df[features].astype(float), df[target].astype(int)
+
+
+def read_state():
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_state(state):
+    os.makedirs(LABELED_DIR, exist_ok=True)
+    with open(STATE_PATH + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(STATE_PATH + ".tmp", STATE_PATH)
+
+
+def base_model(disease):
+    # The full estimator behind the published artifact: the raw/ copy from the
+    # artifact set whose manifest matches its checksum, else the bundled
+    # pickle itself (or the backup compact.py kept of it), else a logistic
+    # regression rebuilt from a compact linear export.
+    path = MODELS[disease]["path"]
+    digest = file_digest(path)
+    versions = sorted(os.listdir(ARTIFACTS_DIR), reverse=True) if os.path.isdir(ARTIFACTS_DIR) else []
+    for version in versions:
+        manifest_path = os.path.join(ARTIFACTS_DIR, version, "manifest.json")
+        if not os.path.exists(manifest_path):
+            continue
+        with open(manifest_path) as f:
+            entry = json.load(f)["models"].get(disease)
+        if entry and entry["sha256"] == digest:
+            return joblib.load(os.path.join(ARTIFACTS_DIR, version, entry["raw_artifact"]))
+    published = None
+    for candidate in (path, path + ".sklearn"):
+        if os.path.exists(candidate):
+            model = joblib.load(candidate)
+            if not isinstance(model, CompactModel):
+                return model
+            published = published or model
+    rebuilt = linear_estimator(published)
+    if rebuilt is None:
+        raise FileNotFoundError(f"No trainable estimator found for the published {disease} model")
+    return rebuilt
+
+
+def linear_estimator(model):
+    # A warm-startable LogisticRegression with the coefficients of a compact
+    # linear export (behind its imputer or not), or None for other models.
+    # train.py's hyperparameters apply to further fits; the imputer is
+    # bundled again when the update is written out.
+    if isinstance(model, CompactPipeline):
+        model = model.model
+    if not isinstance(model, CompactLinearModel):
+        return None
+    estimator = clone(candidate_models()["Logistic Regression"])
+    estimator.classes_ = np.array(model.classes_)
+    estimator.coef_ = np.array(model.coef)[None, :]
+    estimator.intercept_ = np.array([model.intercept])
+    estimator.feature_names_in_ = np.array(model.feature_names_in_)
+    estimator.n_features_in_ = model.n_features_in_
+    estimator.n_iter_ = np.zeros(1, dtype=np.int32)
+    return estimator
+
+
+def drift_report(model, X_ref, X_new, y_new):
+    # Fixed inputs (the kidney id) say nothing about the patients.
+    columns = [col for col in X_ref.columns if col not in KIDNEY_FIXED_VALUES]
+    std = X_ref[columns].std().replace(0, 1)
+    shifts = (X_new[columns].mean() - X_ref[columns].mean()).abs() / std
+    report = {"mean_shift": float(shifts.max()), "shift_feature": shifts.idxmax()}
+    if y_new.nunique() == 2:
+        report["new_roc_auc"] = roc_auc_score(y_new, model.predict_proba(X_new)[:, 1])
+    return report
+
+
+def update_model(model, X_new, y_new, X_all, y_all, refit):
+    # Returns (updated model, action), or (None, "stored") when the model has
+    # no incremental path and nothing has drifted.
+    if refit:
+        return clone(model).fit(X_all, y_all), "refit"
+    if hasattr(model, "get_booster"):
+        updated = clone(model)
+        updated.fit(X_new, y_new, xgb_model=model.get_booster())
+        return updated, "boosting_rounds"
+    if hasattr(model, "partial_fit"):
+        model.partial_fit(X_new, y_new, classes=[0, 1])
+        return model, "partial_fit"
+    if isinstance(model, RandomForestClassifier):
+        grow = max(10, int(model.n_estimators * FOREST_GROWTH))
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + grow).fit(X_all, y_all)
+        return model, "grew_trees"
+    if isinstance(model, LogisticRegression):
+        model.set_params(warm_start=True).fit(X_all, y_all)
+        return model, "warm_start"
+    return None, "stored"
+
+
+def update_disease(disease, rows_seen, shift_threshold=DEFAULT_SHIFT_THRESHOLD, auc_drop=DEFAULT_AUC_DROP, refit=False):
+    # Returns (model or None, metrics) for the store rows after rows_seen.
+    X_store, y_store = load_labeled(disease)
+    metrics = {"new_rows": len(X_store) - rows_seen, "store_rows": len(X_store)}
+    if metrics["new_rows"] < MIN_NEW_ROWS:
+        return None, {**metrics, "action": "waiting"}
+
+    X_train, X_test, y_train, y_test = load_split(disease)
+    X_old = pd.concat([X_train, X_store.iloc[:rows_seen]])
+    y_old = pd.concat([y_train, y_store.iloc[:rows_seen]])
+    X_new, y_new = X_store.iloc[rows_seen:], y_store.iloc[rows_seen:]
+    X_all, y_all = pd.concat([X_old, X_new]), pd.concat([y_old, y_new])
+
+    try:
+        model = base_model(disease)
+    except FileNotFoundError as exc:
+        # A compact forest whose raw copy is gone: leave it for train.py and
+        # carry on with the others.
+        return None, {**metrics, "action": "no_base_estimator", "error": str(exc)}
+    metrics["previous_roc_auc"] = roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+    metrics.update(drift_report(model, X_old, X_new, y_new))
+    drifted = metrics["mean_shift"] > shift_threshold or (
+        metrics["previous_roc_auc"] - metrics.get("new_roc_auc", metrics["previous_roc_auc"]) > auc_drop
+    )
+    metrics["drifted"] = bool(drifted)
+
+    start = time.perf_counter()
+    updated, metrics["action"] = update_model(model, X_new, y_new, X_all, y_all, refit or drifted)
+    metrics["fit_seconds"] = time.perf_counter() - start
+    if updated is None:
+        return None, metrics
+
+    proba = updated.predict_proba(X_test)[:, 1]
+    metrics["roc_auc"] = roc_auc_score(y_test, proba)
+    metrics["accuracy"] = float(((proba >= 0.5).astype(int) == y_test).mean())
+    if metrics["roc_auc"] < metrics["previous_roc_auc"] - MAX_AUC_REGRESSION:
+        return None, {**metrics, "action": "rejected"}
+    return updated, metrics
+
+
+def update_all(diseases, version, publish_models=False, **options):
+    state = read_state()
+    results, report = {}, {}
+    start = time.perf_counter()
+    for disease in diseases:
+        rows_seen = state.get(disease, {}).get("rows_seen", 0)
+        model, metrics = update_disease(disease, rows_seen, **options)
+        report[disease] = metrics
+        if model is not None:
+            results[disease] = {type(model).__name__: (model, metrics)}
+    if not results:
+        return None, report
+
+    out_dir, manifest = write_artifacts(results, version, time.perf_counter() - start)
+    if publish_models:
+        publish(out_dir, manifest)
+        for disease in results:
+            state[disease] = {"rows_seen": report[disease]["store_rows"], "version": version}
+        write_state(state)
+    return out_dir, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update the models from newly labeled outcomes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="append labeled rows to a disease's store")
+    add.add_argument("disease", choices=list(MODELS))
+    add.add_argument("input", help="CSV with the model's input columns and its label column")
+
+    update = commands.add_parser("update", help="update the models from rows added since the last publish")
+    update.add_argument("diseases", nargs="*", help=f"any of {', '.join(MODELS)} (defaults to all four)")
+    update.add_argument("--version", help="artifact version, defaults to a UTC timestamp")
+    update.add_argument("--publish", action="store_true", help="swap the updated models into the repo root")
+    update.add_argument("--refit", action="store_true", help="refit from scratch even without drift")
+    update.add_argument("--shift-threshold", type=float, default=DEFAULT_SHIFT_THRESHOLD)
+    update.add_argument("--auc-drop", type=float, default=DEFAULT_AUC_DROP)
+
+    commands.add_parser("status", help="show store sizes and rows already applied")
+    args = parser.parse_args(argv)
+
+    if args.command == "add":
+        try:
+            count = append_labeled(args.disease, pd.read_csv(args.input))
+        except SchemaError as exc:
+            parser.exit(2, f"error: {exc}\n")
+        print(f"Added {count} {args.disease} rows to {store_path(args.disease)}")
+
+    elif args.command == "status":
+        state = read_state()
+        for disease in MODELS:
+            rows = len(load_labeled(disease)[0])
+            entry = state.get(disease, {})
+            print(f"{disease:<15} {rows:>8} rows  {entry.get('rows_seen', 0):>8} applied  {entry.get('version', '-')}")
+
+    else:
+        unknown = [disease for disease in args.diseases if disease not in MODELS]
+        if unknown:
+            parser.error(f"unknown disease(s): {', '.join(unknown)}")
+        version = args.version or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        out_dir, report = update_all(
+            args.diseases or list(MODELS),
+            version,
+            args.publish,
+            shift_threshold=args.shift_threshold,
+            auc_drop=args.auc_drop,
+            refit=args.refit,
+        )
+        for disease, metrics in report.items():
+            line = f"{disease:<15} {metrics['action']:<17} {metrics['new_rows']:>6} new rows"
+            if "roc_auc" in metrics:
+                line += f"  auc {metrics['previous_roc_auc']:.4f} -> {metrics['roc_auc']:.4f}"
+            if "mean_shift" in metrics:
+                line += f"  shift {metrics['mean_shift']:.2f} ({metrics['shift_feature']})"
+            if "error" in metrics:
+                line += f"  {metrics['error']}"
+            print(line)
+        if out_dir is None:
+            print("Nothing to update")
+            sys.exit(0)
+        print(f"Wrote {out_dir}" + (" and published" if args.publish else ""))
+
+
+if __name__ == "__main__":
+    main()
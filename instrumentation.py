@@ -0,0 +1,112 @@
+# Opt-in stage timing for the prediction hot path. Set CDD_METRICS=1 to turn
+# it on; otherwise timed() hands back a shared no-op context manager and costs
+# one function call. Timings go into per-(stage, disease) histograms that can
+# be rendered in Prometheus text format (the API serves them on /metrics, and
+# the Streamlit app writes them to CDD_METRICS_FILE after every rerun).
+import bisect
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("CDD_METRICS", "").lower() in ("1", "true", "yes")
+METRICS_FILE = os.environ.get("CDD_METRICS_FILE")
+
+# Histogram bucket upper bounds in seconds.
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+_histograms = {}
+_lock = threading.Lock()
+_session = threading.local()
+
+
+class _Timer:
+    __slots__ = ("key", "start")
+
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+def timed(stage, disease=""):
+    if not ENABLED:
+        return _NOOP
+    return _Timer((stage, disease))
+
+
+def observe(key, seconds):
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+    counters = getattr(_session, "counters", None)
+    if counters is not None:
+        name = f"{key[1]}.{key[0]}" if key[1] else key[0]
+        counters[name] = counters.get(name, 0) + 1
+
+
+def bind_session(counters):
+    # Count this thread's stages into counters as well (e.g. a dict kept in
+    # st.session_state), giving per-session totals on top of the global ones.
+    _session.counters = counters
+
+
+def render_prometheus():
+    lines = [
+        "# HELP cdd_stage_seconds Time spent in each prediction stage.",
+        "# TYPE cdd_stage_seconds histogram",
+    ]
+    with _lock:
+        items = sorted((key, list(h.counts), h.sum, h.count) for key, h in _histograms.items())
+    for (stage, disease), counts, total, count in items:
+        labels = f'stage="{stage}",disease="{disease}"'
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, counts):
+            cumulative += bucket_count
+            lines.append(f'cdd_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'cdd_stage_seconds_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f"cdd_stage_seconds_sum{{{labels}}} {total}")
+        lines.append(f"cdd_stage_seconds_count{{{labels}}} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def export(path=None):
+    # Write the histograms for a node_exporter textfile collector.
+    path = path or METRICS_FILE
+    if not ENABLED or not path:
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
@@ -1,15 +1,11 @@
 import streamlit as st
-import pandas as pd
-import joblib
-from sklearn.preprocessing import OrdinalEncoder
-
-# Load kidney disease model
-@st.cache_resource
-def load_model():
-    return joblib.load("best_chronic_kidney_disease_model.pkl")
-
-model = load_model()
+from explain import show_drivers
+from instrumentation import timed
+from prediction_cache import cached_predict_proba
+from scoring import risk_fields
+from kidney_encoding import encode_kidney_record
 
+@st.cache_data(show_spinner=False)
 def show_recommendations(high_risk: bool):
     if high_risk:
         st.markdown('<div class="rec-box high-risk">', unsafe_allow_html=True)
@@ -107,105 +103,101 @@ def show():
     st.title("🩺 Kidney Disease Risk Predictor")
     st.markdown("Enter the following medical information to get your estimated risk of kidney disease.")
     
-    categories = [
-    ["normal", "abnormal"],      # rbc
-    ["normal", "abnormal"],      # pc
-    ["not present", "present"],  # pcc
-    ["not present", "present"],  # ba
-    ["no", "yes"],               # htn
-    ["no", "yes"],               # dm
-    ["no", "yes"],               # cad
-    ["poor", "good"],            # appet
-    ["no", "yes"],               # pe
-    ["no", "yes"]                # ane
-    ]
-
-    encoder = OrdinalEncoder(categories=categories)
-    encoder.fit([cat for cat in zip(*categories)]) 
-    
-    # Numeric Inputs
-    age = st.number_input("Age", min_value=1, max_value=100, step=1)
-    bp = st.number_input("Blood Pressure (mm Hg)", min_value=50, max_value=180, step=1)
-    sg = st.number_input("Specific Gravity", min_value=1.005, max_value=1.025, step=0.001, format="%.3f")
-    al = st.number_input("Albumin", min_value=0, max_value=5, step=1)
-    su = st.number_input("Sugar", min_value=0, max_value=5, step=1)
-    bgr = st.number_input("Blood Glucose Random (mg/dL)", min_value=50, max_value=500, step=1)
-    bu = st.number_input("Blood Urea (mg/dL)", min_value=1, max_value=300, step=1)
-    sc = st.number_input("Serum Creatinine (mg/dL)", min_value=0.1, max_value=15.0, step=0.1)
-    sod = st.number_input("Sodium (mEq/L)", min_value=100, max_value=150, step=1)
-    pot = st.number_input("Potassium (mEq/L)", min_value=2.5, max_value=7.0, step=0.1)
-    hemo = st.number_input("Hemoglobin (g/dL)", min_value=3.0, max_value=17.5, step=0.1)
-    pcv = st.number_input("Packed Cell Volume (%)", min_value=10, max_value=55, step=1)
-    wc = st.number_input("White Blood Cell Count (/mm³)", min_value=3000, max_value=20000, step=100)
-    rc = st.number_input("Red Blood Cell Count (millions/μL)", min_value=2.0, max_value=6.5, step=0.1)
-
-    # Categorical Inputs
-    rbc = st.selectbox("Red Blood Cells", options=["Select...", "normal", "abnormal"])
-    pc = st.selectbox("Pus Cell", options=["Select...", "normal", "abnormal"])
-    pcc = st.selectbox("Pus Cell Clumps", options=["Select...", "present", "not present"])
-    ba = st.selectbox("Bacteria", options=["Select...", "present", "not present"])
-    htn = st.selectbox("Hypertension", options=["Select...", "yes", "no"])
-    dm = st.selectbox("Diabetes Mellitus", options=["Select...", "yes", "no"])
-    cad = st.selectbox("Coronary Artery Disease", options=["Select...", "yes", "no"])
-    appet = st.selectbox("Appetite", options=["Select...", "good", "poor"])
-    pe = st.selectbox("Pedal Edema", options=["Select...", "yes", "no"])
-    ane = st.selectbox("Anemia", options=["Select...", "yes", "no"])
- 
-    if st.button("Load Results"):
+    with st.form("kidney_form"):
+        # Numeric Inputs
+        age = st.number_input("Age", min_value=1, max_value=100, step=1)
+        bp = st.number_input("Blood Pressure (mm Hg)", min_value=50, max_value=180, step=1)
+        sg = st.number_input("Specific Gravity", min_value=1.005, max_value=1.025, step=0.001, format="%.3f")
+        al = st.number_input("Albumin", min_value=0, max_value=5, step=1)
+        su = st.number_input("Sugar", min_value=0, max_value=5, step=1)
+        bgr = st.number_input("Blood Glucose Random (mg/dL)", min_value=50, max_value=500, step=1)
+        bu = st.number_input("Blood Urea (mg/dL)", min_value=1, max_value=300, step=1)
+        sc = st.number_input("Serum Creatinine (mg/dL)", min_value=0.1, max_value=15.0, step=0.1)
+        sod = st.number_input("Sodium (mEq/L)", min_value=100, max_value=150, step=1)
+        pot = st.number_input("Potassium (mEq/L)", min_value=2.5, max_value=7.0, step=0.1)
+        hemo = st.number_input("Hemoglobin (g/dL)", min_value=3.0, max_value=17.5, step=0.1)
+        pcv = st.number_input("Packed Cell Volume (%)", min_value=10, max_value=55, step=1)
+        wc = st.number_input("White Blood Cell Count (/mm³)", min_value=3000, max_value=20000, step=100)
+        rc = st.number_input("Red Blood Cell Count (millions/μL)", min_value=2.0, max_value=6.5, step=0.1)
+
+        # Categorical Inputs
+        rbc = st.selectbox("Red Blood Cells", options=["Select...", "normal", "abnormal"])
+        pc = st.selectbox("Pus Cell", options=["Select...", "normal", "abnormal"])
+        pcc = st.selectbox("Pus Cell Clumps", options=["Select...", "present", "not present"])
+        ba = st.selectbox("Bacteria", options=["Select...", "present", "not present"])
+        htn = st.selectbox("Hypertension", options=["Select...", "yes", "no"])
+        dm = st.selectbox("Diabetes Mellitus", options=["Select...", "yes", "no"])
+        cad = st.selectbox("Coronary Artery Disease", options=["Select...", "yes", "no"])
+        appet = st.selectbox("Appetite", options=["Select...", "good", "poor"])
+        pe = st.selectbox("Pedal Edema", options=["Select...", "yes", "no"])
+        ane = st.selectbox("Anemia", options=["Select...", "yes", "no"])
+        submitted = st.form_submit_button("Load Results")
+
+    if submitted:
         if (
             rbc == "Select..." or pc == "Select..." or pcc == "Select..."
             or ba == "Select..." or htn == "Select..." or dm == "Select..."
             or cad == "Select..." or appet == "Select..." or pe == "Select..."
             or ane == "Select..."
         ):
+            st.session_state.get("results", {}).pop("kidney", None)
             st.error("Please select all categorical values (no 'Select...').")
         else:
-            input_data = pd.DataFrame([{
-                "id": 0,
-                "age": age,
-                "bp": bp,
-                "sg": sg,
-                "al": al,
-                "su": su,
-                "rbc": rbc,
-                "pc": pc,
-                "pcc": pcc,
-                "ba": ba,
-                "bgr": bgr,
-                "bu": bu,
-                "sc": sc,
-                "sod": sod,
-                "pot": pot,
-                "hemo": hemo,
-                "pcv": pcv,
-                "wc": wc,
-                "rc": rc,
-                "htn": htn,
-                "dm": dm,
-                "cad": cad,
-                "appet": appet,
-                "pe": pe,
-                "ane": ane
-            }])
-
-            categorical_cols = ["rbc", "pc", "pcc", "ba", "htn", "dm", "cad", "appet", "pe", "ane"]
-            input_data[categorical_cols] = encoder.transform(input_data[categorical_cols])
+            with timed("input_assembly", "kidney"):
+                record = {
+                    "id": 0,
+                    "age": age,
+                    "bp": bp,
+                    "sg": sg,
+                    "al": al,
+                    "su": su,
+                    "rbc": rbc,
+                    "pc": pc,
+                    "pcc": pcc,
+                    "ba": ba,
+                    "bgr": bgr,
+                    "bu": bu,
+                    "sc": sc,
+                    "sod": sod,
+                    "pot": pot,
+                    "hemo": hemo,
+                    "pcv": pcv,
+                    "wc": wc,
+                    "rc": rc,
+                    "htn": htn,
+                    "dm": dm,
+                    "cad": cad,
+                    "appet": appet,
+                    "pe": pe,
+                    "ane": ane
+                }
+            with timed("encoding", "kidney"):
+                input_data = encode_kidney_record(record)
 
             # Get prediction score
-            prediction_proba = model.predict_proba(input_data)[0][1]
-            prediction_score = int(prediction_proba * 100)
-            high_risk = prediction_score >= 75
-
-            # Output section
-            st.markdown("### Kidney Disease Risk Score:")
-            st.metric(label="Score", value=f"{prediction_score}%")
-            st.progress(prediction_score)
-
-            if high_risk:
-                st.markdown("<h4 style='color: red; text-align:center;'>Patient at <strong>high risk</strong> for kidney disease.</h4>", unsafe_allow_html=True)
-            else:
-                st.markdown("<h4 style='color: green; text-align:center;'>Patient at <strong>low to medium risk</strong> for kidney disease.</h4>", unsafe_allow_html=True)
+            with timed("predict_proba", "kidney"):
+                prediction_proba = cached_predict_proba("kidney", input_data)
+            st.session_state.setdefault("results", {})["kidney"] = (input_data, risk_fields("kidney", prediction_proba))
+
+    # Shown from session state, so reruns that don't submit the form skip scoring
+    if "kidney" in st.session_state.get("results", {}):
+        input_data, risk = st.session_state["results"]["kidney"]
+        prediction_score = risk["risk_score"]
+        high_risk = risk["high_risk"]
+
+        # Output section
+        st.markdown("### Kidney Disease Risk Score:")
+        st.metric(label="Score", value=f"{prediction_score}%")
+        st.progress(prediction_score)
+        with timed("explain", "kidney"):
+            show_drivers("kidney", input_data)
+
+        if high_risk:
+            st.markdown("<h4 style='color: red; text-align:center;'>Patient at <strong>high risk</strong> for kidney disease.</h4>", unsafe_allow_html=True)
+        else:
+            st.markdown("<h4 style='color: green; text-align:center;'>Patient at <strong>low to medium risk</strong> for kidney disease.</h4>", unsafe_allow_html=True)
 
+        with timed("recommendations", "kidney"):
             show_recommendations(high_risk)
 
 # Run standalone
@@ -0,0 +1,49 @@
+# Precomputed kidney categorical encoding. Every accepted spelling maps
+# straight to the code the model was trained with, so single rows are
+# encoded with dict lookups and batches with one Series.map per column.
+from schemas import KIDNEY_CATEGORICAL_COLS, KIDNEY_CATEGORY_ALIASES, KIDNEY_CATEGORY_CODES
+
+KIDNEY_LOOKUP = {
+    col: {
+        **codes,
+        **{alias: codes[value] for alias, value in KIDNEY_CATEGORY_ALIASES.items() if value in codes},
+    }
+    for col, codes in KIDNEY_CATEGORY_CODES.items()
+}
+
+
+class UnknownCategoryError(ValueError):
+    pass
+
+
+def encode_kidney_value(col, value):
+    try:
+        return KIDNEY_LOOKUP[col][value]
+    except KeyError:
+        pass
+    code = KIDNEY_LOOKUP[col].get(str(value).strip().lower())
+    if code is None:
+        raise UnknownCategoryError(f"Unknown value {value!r} for '{col}'. Expected one of: {', '.join(KIDNEY_LOOKUP[col])}")
+    return code
+
+
+def encode_kidney_record(record):
+    # Returns a copy of record with each categorical field replaced by its code.
+    encoded = dict(record)
+    for col in KIDNEY_CATEGORICAL_COLS:
+        encoded[col] = encode_kidney_value(col, record[col])
+    return encoded
+
+
+def encode_kidney_frame(df, allow_missing=False):
+    # Vectorized version for batches; returns a new frame. With allow_missing,
+    # empty cells stay NaN (for training rows that are imputed later).
+    encoded = {}
+    for col in KIDNEY_CATEGORICAL_COLS:
+        codes = df[col].astype(str).str.strip().str.lower().map(KIDNEY_LOOKUP[col])
+        unknown = codes.isna() & df[col].notna() if allow_missing else codes.isna()
+        if unknown.any():
+            values = ", ".join(repr(v) for v in df.loc[unknown, col].unique()[:5])
+            raise UnknownCategoryError(f"Unknown value(s) for '{col}': {values}")
+        encoded[col] = codes
+    return df.assign(**encoded)
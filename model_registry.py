@@ -0,0 +1,132 @@
+# Process-wide model registry. Each model is unpickled the first time a page,
+# batch job or API route asks for it, so a cold start that only renders the
+# Home page never imports sklearn/xgboost or touches the .pkl files.
+# Models are loaded with joblib's mmap_mode (CDD_MMAP_MODE, default "r"), so
+# arrays in artifacts written by compact.dump_mmap() are mapped read-only from
+# the page cache rather than copied into each process.
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from instrumentation import timed
+from schemas import MODELS
+
+logger = logging.getLogger(__name__)
+
+MMAP_MODE = os.environ.get("CDD_MMAP_MODE", "r") or None
+
+_models = {}
+_load_times = {}
+_fingerprints = {}
+_file_stats = {}
+_locks = {disease: threading.Lock() for disease in MODELS}
+
+
+def get_model(disease):
+    model = _models.get(disease)
+    if model is None:
+        with _locks[disease]:
+            model = _models.get(disease)
+            if model is None:
+                model = _load(disease)
+    return model
+
+
+def reload(disease):
+    with _locks[disease]:
+        return _load(disease)
+
+
+def read_artifact(disease):
+    # Loads the artifact on disk without installing it.
+    # Returns (model, sha256, stat, seconds).
+    import joblib
+
+    path = MODELS[disease]["path"]
+    while True:
+        start = time.perf_counter()
+        stat = _stat(path)
+        digest = file_digest(path)
+        with timed("model_load", disease):
+            model = joblib.load(path, mmap_mode=MMAP_MODE)
+        # Replaced while we were reading it: the digest may not match, so go again.
+        if _stat(path) == stat:
+            return model, digest, stat, time.perf_counter() - start
+
+
+def install(disease, model, digest, stat, seconds):
+    # Swaps in an already loaded model. Callers holding the old one finish
+    # with it; every later get_model() returns the new one.
+    with _locks[disease]:
+        _install(disease, model, digest, stat, seconds)
+
+
+def _install(disease, model, digest, stat, seconds):
+    # Model before fingerprint: a cache key built from the new fingerprint
+    # must never be filled in by the old model.
+    _models[disease] = model
+    _fingerprints[disease] = digest
+    _file_stats[disease] = stat
+    _load_times[disease] = seconds
+
+
+def _load(disease):
+    model, digest, stat, seconds = read_artifact(disease)
+    _install(disease, model, digest, stat, seconds)
+    logger.info("Loaded %s model in %.1f ms", disease, seconds * 1000)
+    return model
+
+
+def _stat(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(disease):
+    # SHA-256 of the artifact the loaded model came from.
+    get_model(disease)
+    return _fingerprints[disease]
+
+
+def artifact_stat(disease):
+    return _stat(MODELS[disease]["path"])
+
+
+def mark_current(disease, stat):
+    # The file was rewritten with identical contents; stop reporting it as changed.
+    _file_stats[disease] = stat
+
+
+def artifact_changed(disease):
+    # Cheap stat() check of the file on disk against the loaded model.
+    if disease not in _file_stats:
+        return False
+    try:
+        return _stat(MODELS[disease]["path"]) != _file_stats[disease]
+    except OSError:
+        return False
+
+
+def is_loaded(disease):
+    return disease in _models
+
+
+def load_times():
+    # Seconds spent unpickling each model loaded so far in this process.
+    return dict(_load_times)
+
+
+if __name__ == "__main__":
+    for disease in MODELS:
+        get_model(disease)
+        print(f"{disease:<15} {load_times()[disease] * 1000:8.1f} ms")
@@ -0,0 +1,94 @@
+# LRU/TTL cache of single-row predictions, shared by every Streamlit session
+# and API thread in the process. Keys are the loaded model's file hash plus
+# the exact float64 feature vector a page builds, so a model swapped in by
+# hot_reload never serves the previous model's scores.
+import threading
+import time
+from collections import OrderedDict
+
+import drift
+import model_registry
+from fast_path import get_predictor
+
+DEFAULT_MAXSIZE = 10_000
+DEFAULT_TTL = 3600.0
+
+
+class PredictionCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, disease, row, compute):
+        key = (disease, model_registry.fingerprint(disease), row.tobytes())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = (value, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, disease=None):
+        with self._lock:
+            stale = [key for key in self._entries if disease is None or key[0] == disease]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+cache = PredictionCache()
+
+
+def cached_predict_proba(disease, record, predict=None):
+    # record maps every schema feature to its (encoded) value. predict, if
+    # given, scores the float row on a miss (e.g. via the batcher); otherwise
+    # the disease's fast-path predictor does.
+    X = get_predictor(disease).vector(record)
+    drift.observe(disease, X)
+    if predict is None:
+        def compute():
+            return float(get_predictor(disease).predict(X)[0])
+    else:
+        def compute():
+            return predict(X[0].copy())
+    return cache.get_or_compute(disease, X[0], compute)
+
+
+def cache_stats():
+    return cache.stats()
@@ -0,0 +1,60 @@
+# Training-data preprocessing that ships inside the model artifact. Instead
+# of dropping incomplete rows (242 of the kidney CSV's 400 have a gap), each
+# missing value is filled from the training split: the median for numeric
+# inputs, the most common code for categorical ones. Categorical codes come
+# from the explicit schemas.KIDNEY_CATEGORY_CODES that serving encodes with
+# too, and the fitted Imputer records them so a model is never served
+# against a different coding. Fixed inputs (the kidney row id) are pinned to
+# the value the pages send, so the model can't learn anything from them.
+#
+# train.py bundles the Imputer with the winning model as a
+# compact.CompactPipeline; filling a batch is a single np.where.
+import numpy as np
+
+from schemas import KIDNEY_FIXED_VALUES, MODELS, category_codes
+
+
+class Imputer:
+    def __init__(self, fill, pinned, feature_names, categories):
+        self.fill = np.asarray(fill, dtype=np.float64)
+        self.pinned = np.asarray(pinned, dtype=bool)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.categories = categories
+
+    def transform(self, X):
+        # Float array with missing values and pinned columns replaced.
+        X = np.asarray(X, dtype=np.float64)
+        return np.where(np.isnan(X) | self.pinned, self.fill, X)
+
+    def transform_frame(self, X):
+        import pandas as pd
+
+        return pd.DataFrame(self.transform(X.to_numpy()), index=X.index, columns=X.columns)
+
+    def to_dict(self):
+        return {
+            "fill": dict(zip(self.feature_names_in_.tolist(), self.fill.tolist())),
+            "pinned": self.feature_names_in_[self.pinned].tolist(),
+        }
+
+
+def fit_imputer(disease, X):
+    # Imputer for encoded training rows X, or None when they have no gaps and
+    # nothing needs pinning.
+    fixed = KIDNEY_FIXED_VALUES if disease == "kidney" else {}
+    if not fixed and not X.isna().any().any():
+        return None
+    codes = category_codes(disease)
+    features = MODELS[disease]["features"]
+    fill = []
+    for feature in features:
+        values = X[feature].dropna().to_numpy()
+        if feature in fixed:
+            fill.append(fixed[feature])
+        elif not len(values):
+            fill.append(0.0)
+        elif feature in codes:
+            fill.append(float(np.bincount(values.astype(np.intp)).argmax()))
+        else:
+            fill.append(float(np.median(values)))
+    return Imputer(fill, [feature in fixed for feature in features], features, codes)
@@ -0,0 +1,227 @@
+# Precomputed risk grids for what-if exploration on the heart and breast
+# cancer pages. The model is scored once, offline, on a grid over the page's
+# input ranges: every value of each discrete input and a few points per
+# continuous one (placed at quantiles of the training data, plus the widget
+# bounds). Queries are answered by exact lookup on the discrete axes and
+# multilinear interpolation of the logit on the continuous axes, so a
+# logistic regression is reproduced up to float16 rounding. The error against
+# the real predict_proba is measured on dataset rows and random points when
+# the grid is built; grids that miss --max-error are not saved, and the
+# bound is shown with every estimate.
+#
+#   python risk_grid.py [heart] [breast_cancer]
+import argparse
+import itertools
+import logging
+import os
+
+import numpy as np
+
+import model_registry
+from schemas import MODELS
+
+logger = logging.getLogger(__name__)
+
+GRIDS_DIR = "grids"
+EVAL_POINTS = 2000
+PROBA_CLIP = 1e-4
+# Grids whose measured error exceeds this are not saved; the explorer then
+# scores with the model itself. Tree ensembles are step functions and rarely
+# interpolate this well.
+DEFAULT_MAX_ERROR = 0.02
+
+# Discrete inputs list their values; continuous ones give
+# (points from data quantiles, lowest, highest) within the page's widget bounds.
+GRID_AXES = {
+    "heart": {
+        "age": (3, 20, 100),
+        "sex": [0, 1],
+        "cp": [0, 1, 2, 3],
+        "trtbps": (2, 90, 200),
+        "chol": (2, 100, 600),
+        "fbs": [0, 1],
+        "restecg": [0, 1, 2],
+        "thalachh": (3, 60, 220),
+        "exng": [0, 1],
+        "oldpeak": (2, 0.0, 6.0),
+        "slp": [0, 1, 2],
+        "caa": [0, 1, 2, 3],
+        "thall": [1, 2, 3],
+    },
+    "breast_cancer": {
+        "mean_radius": (14, 0.0, 50.0),
+        "mean_texture": (14, 0.0, 50.0),
+        "mean_perimeter": (14, 0.0, 200.0),
+        "mean_area": (14, 0.0, 3000.0),
+        "mean_smoothness": (14, 0.0, 1.0),
+    },
+}
+
+
+def _logit(proba):
+    proba = np.clip(proba, PROBA_CLIP, 1 - PROBA_CLIP)
+    return np.log(proba) - np.log1p(-proba)
+
+
+class RiskGrid:
+    def __init__(self, disease, axes, continuous, logits, model_sha256):
+        self.disease = disease
+        self.axes = axes
+        self.continuous = continuous
+        self.logits = logits
+        self.model_sha256 = model_sha256
+        self.max_error = None
+        self.p99_error = None
+
+    @property
+    def features(self):
+        return MODELS[self.disease]["features"]
+
+    def lookup(self, X):
+        # Positive-class probabilities for an (n, n_features) array; NaN for
+        # rows off the grid (a discrete value it doesn't hold, or out of range).
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        n = len(X)
+        valid = np.ones(n, dtype=bool)
+        base = []
+        fractions = []
+        for j, axis in enumerate(self.axes):
+            x = X[:, j]
+            if self.continuous[j]:
+                valid &= (x >= axis[0]) & (x <= axis[-1])
+                i = np.clip(np.searchsorted(axis, x, side="right") - 1, 0, len(axis) - 2)
+                fractions.append((x - axis[i]) / (axis[i + 1] - axis[i]))
+            else:
+                i = np.clip(np.searchsorted(axis, x), 0, len(axis) - 1)
+                valid &= axis[i] == x
+            base.append(i)
+
+        flat = self.logits.reshape(-1)
+        logit = np.zeros(n)
+        dims = [j for j, is_continuous in enumerate(self.continuous) if is_continuous]
+        for corner in itertools.product((0, 1), repeat=len(dims)):
+            index = list(base)
+            weight = np.ones(n)
+            for j, t, bit in zip(dims, fractions, corner):
+                index[j] = base[j] + bit
+                weight *= t if bit else 1 - t
+            logit += weight * flat[np.ravel_multi_index(index, self.logits.shape, mode="clip")]
+        proba = 1 / (1 + np.exp(-logit))
+        proba[~valid] = np.nan
+        return proba
+
+
+def _axis(values, spec):
+    if isinstance(spec, list):
+        return np.asarray(spec, dtype=np.float64), False
+    points, low, high = spec
+    quantiles = np.quantile(np.clip(values, low, high), np.linspace(0, 1, points))
+    return np.unique(np.concatenate([[low], quantiles, [high]])), True
+
+
+def build(disease, model=None, batch_rows=200_000):
+    from fast_path import FastPredictor
+    from training_data import load_dataset
+
+    model = model if model is not None else model_registry.get_model(disease)
+    predictor = FastPredictor(disease, model)
+    X, _ = load_dataset(disease)
+    axes, continuous = [], []
+    for feature in MODELS[disease]["features"]:
+        axis, is_continuous = _axis(X[feature].to_numpy(), GRID_AXES[disease][feature])
+        axes.append(axis)
+        continuous.append(is_continuous)
+
+    shape = tuple(len(axis) for axis in axes)
+    logits = np.empty(int(np.prod(shape)), dtype=np.float16)
+    for start in range(0, len(logits), batch_rows):
+        index = np.unravel_index(np.arange(start, min(start + batch_rows, len(logits))), shape)
+        points = np.column_stack([axis[i] for axis, i in zip(axes, index)])
+        logits[start:start + len(points)] = _logit(predictor.predict(points))
+
+    grid = RiskGrid(disease, axes, continuous, logits.reshape(shape), model_registry.fingerprint(disease))
+    points = _eval_points(grid, X.to_numpy())
+    errors = np.abs(grid.lookup(points) - predictor.predict(points))
+    grid.max_error = float(np.nanmax(errors))
+    grid.p99_error = float(np.nanpercentile(errors, 99))
+    return grid
+
+
+def _eval_points(grid, rows, seed=0):
+    # Dataset rows moved onto the grid's discrete values and ranges, plus
+    # uniform random points inside the grid.
+    rng = np.random.default_rng(seed)
+    random = np.column_stack([
+        rng.uniform(axis[0], axis[-1], EVAL_POINTS) if is_continuous else rng.choice(axis, EVAL_POINTS)
+        for axis, is_continuous in zip(grid.axes, grid.continuous)
+    ])
+    snapped = rows.copy()
+    for j, (axis, is_continuous) in enumerate(zip(grid.axes, grid.continuous)):
+        if is_continuous:
+            snapped[:, j] = np.clip(snapped[:, j], axis[0], axis[-1])
+        else:
+            snapped[:, j] = axis[np.abs(snapped[:, j][:, None] - axis).argmin(axis=1)]
+    return np.vstack([snapped, random])
+
+
+def grid_path(disease):
+    return os.path.join(GRIDS_DIR, f"{disease}.grid.pkl")
+
+
+def save(grid):
+    import joblib
+
+    os.makedirs(GRIDS_DIR, exist_ok=True)
+    path = grid_path(grid.disease)
+    joblib.dump(grid, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+_grids = {}
+
+
+def get_grid(disease):
+    # The saved grid for the currently loaded model, or None when there is
+    # none (or it was built for a model that has since been replaced).
+    if disease not in _grids:
+        import joblib
+
+        path = grid_path(disease)
+        _grids[disease] = joblib.load(path, mmap_mode="r") if os.path.exists(path) else None
+    grid = _grids[disease]
+    if grid is not None and grid.model_sha256 != model_registry.fingerprint(disease):
+        logger.warning("Ignoring the %s risk grid: it was built for a different model", disease)
+        return None
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute risk grids for the what-if explorer.")
+    parser.add_argument("diseases", nargs="*", help=f"any of {', '.join(GRID_AXES)} (defaults to both)")
+    parser.add_argument("--max-error", type=float, default=DEFAULT_MAX_ERROR, help="largest acceptable probability error")
+    args = parser.parse_args(argv)
+
+    unknown = [disease for disease in args.diseases if disease not in GRID_AXES]
+    if unknown:
+        parser.error(f"no grid defined for: {', '.join(unknown)}")
+
+    # Pickle RiskGrid under "risk_grid", not "__main__", when run as a script.
+    import risk_grid
+
+    for disease in args.diseases or GRID_AXES:
+        grid = risk_grid.build(disease)
+        summary = (
+            f"{disease:<15} {grid.logits.size:>10,} points  {grid.logits.nbytes / 2**20:6.1f} MB  "
+            f"max error {grid.max_error:.4f}  p99 {grid.p99_error:.4f}"
+        )
+        if grid.max_error > args.max_error:
+            print(f"{summary}  -> not saved (over --max-error {args.max_error})")
+            if os.path.exists(grid_path(disease)):
+                os.remove(grid_path(disease))
+            continue
+        risk_grid.save(grid)
+        print(f"{summary}  -> {grid_path(disease)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# Feature schemas shared by the Streamlit pages, batch scoring and the API.
+# Column order matches the DataFrames each page's show() builds, which is
+# also the order the pickled models were fitted with.
+
+DIABETES_FEATURES = [
+    "Pregnancies",
+    "Glucose",
+    "BloodPressure",
+    "SkinThickness",
+    "Insulin",
+    "BMI",
+    "DiabetesPedigreeFunction",
+    "Age",
+]
+
+KIDNEY_FEATURES = [
+    "id",
+    "age",
+    "bp",
+    "sg",
+    "al",
+    "su",
+    "rbc",
+    "pc",
+    "pcc",
+    "ba",
+    "bgr",
+    "bu",
+    "sc",
+    "sod",
+    "pot",
+    "hemo",
+    "pcv",
+    "wc",
+    "rc",
+    "htn",
+    "dm",
+    "cad",
+    "appet",
+    "pe",
+    "ane",
+]
+
+HEART_FEATURES = [
+    "age",
+    "sex",
+    "cp",
+    "trtbps",
+    "chol",
+    "fbs",
+    "restecg",
+    "thalachh",
+    "exng",
+    "oldpeak",
+    "slp",
+    "caa",
+    "thall",
+]
+
+BREAST_CANCER_FEATURES = [
+    "mean_radius",
+    "mean_texture",
+    "mean_perimeter",
+    "mean_area",
+    "mean_smoothness",
+]
+
+KIDNEY_CATEGORICAL_COLS = ["rbc", "pc", "pcc", "ba", "htn", "dm", "cad", "appet", "pe", "ane"]
+
+# Codes the kidney model was trained with: the notebook's OrdinalEncoder
+# sorted each column's values alphabetically, using the dataset's spellings.
+KIDNEY_CATEGORY_CODES = {
+    "rbc": {"abnormal": 0, "normal": 1},
+    "pc": {"abnormal": 0, "normal": 1},
+    "pcc": {"notpresent": 0, "present": 1},
+    "ba": {"notpresent": 0, "present": 1},
+    "htn": {"no": 0, "yes": 1},
+    "dm": {"no": 0, "yes": 1},
+    "cad": {"no": 0, "yes": 1},
+    "appet": {"good": 0, "poor": 1},
+    "pe": {"no": 0, "yes": 1},
+    "ane": {"no": 0, "yes": 1},
+}
+
+# Other spellings accepted for the dataset's values (the page shows "not present").
+KIDNEY_CATEGORY_ALIASES = {"not present": "notpresent"}
+
+# The kidney page always sends id 0, so batch and API callers do too.
+KIDNEY_FIXED_VALUES = {"id": 0}
+
+# Labels the heart page offers for its coded fields, with the code each stands
+# for. Batch files may use either the label or the code.
+HEART_SEX_MAP = {"Female": 0, "Male": 1}
+HEART_CP_MAP = {
+    "Typical angina (0)": 0,
+    "Atypical angina (1)": 1,
+    "Non-anginal pain (2)": 2,
+    "Asymptomatic (3)": 3,
+}
+HEART_FBS_MAP = {"False (0)": 0, "True (1)": 1}
+HEART_RESTECG_MAP = {
+    "Normal (0)": 0,
+    "ST-T wave abnormality (1)": 1,
+    "Left ventricular hypertrophy (2)": 2,
+}
+HEART_EXNG_MAP = {"No (0)": 0, "Yes (1)": 1}
+HEART_SLP_MAP = {
+    "Upsloping (0)": 0,
+    "Flat (1)": 1,
+    "Downsloping (2)": 2,
+}
+HEART_THALL_MAP = {
+    "Normal (1)": 1,
+    "Fixed defect (2)": 2,
+    "Reversible defect (3)": 3,
+}
+HEART_LABEL_MAPS = {
+    "sex": HEART_SEX_MAP,
+    "cp": HEART_CP_MAP,
+    "fbs": HEART_FBS_MAP,
+    "restecg": HEART_RESTECG_MAP,
+    "exng": HEART_EXNG_MAP,
+    "slp": HEART_SLP_MAP,
+    "thall": HEART_THALL_MAP,
+}
+
+HIGH_RISK_THRESHOLD = 75
+
+MODELS = {
+    "diabetes": {
+        "label": "Diabetes",
+        "path": "best_diabetes_model.pkl",
+        "features": DIABETES_FEATURES,
+    },
+    "kidney": {
+        "label": "Kidney Disease",
+        "path": "best_chronic_kidney_disease_model.pkl",
+        "features": KIDNEY_FEATURES,
+    },
+    "heart": {
+        "label": "Heart Disease",
+        "path": "best_heart_disease_model.pkl",
+        "features": HEART_FEATURES,
+    },
+    "breast_cancer": {
+        "label": "Breast Cancer",
+        "path": "best_breast_cancer_model.pkl",
+        "features": BREAST_CANCER_FEATURES,
+    },
+}
+
+
+def input_columns(disease):
+    # Columns a caller has to supply; fixed values are filled in for them.
+    fixed = KIDNEY_FIXED_VALUES if disease == "kidney" else {}
+    return [col for col in MODELS[disease]["features"] if col not in fixed]
+
+
+def category_codes(disease):
+    # Codes of the disease's categorical inputs, shared by training and serving.
+    return KIDNEY_CATEGORY_CODES if disease == "kidney" else {}
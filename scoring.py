@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+import drift
+from calibration import get_calibration
+from kidney_encoding import UnknownCategoryError, encode_kidney_frame
+from model_registry import get_model
+from schemas import HEART_LABEL_MAPS, KIDNEY_FIXED_VALUES, MODELS, input_columns
+
+HEART_LOOKUP = {
+    col: {label.strip().lower(): code for label, code in labels.items()}
+    for col, labels in HEART_LABEL_MAPS.items()
+}
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def validate_columns(disease, columns):
+    if disease not in MODELS:
+        raise SchemaError(f"Unknown disease '{disease}'. Expected one of: {', '.join(MODELS)}")
+    missing = [col for col in input_columns(disease) if col not in columns]
+    if missing:
+        raise SchemaError(f"Missing columns for {disease}: {', '.join(missing)}")
+
+
+def prepare_features(disease, df):
+    # Build the model input frame the same way the disease's show() does.
+    validate_columns(disease, df.columns)
+    features = MODELS[disease]["features"]
+    data = df.reindex(columns=features)
+
+    if disease == "kidney":
+        try:
+            data = encode_kidney_frame(data.assign(**KIDNEY_FIXED_VALUES))
+        except UnknownCategoryError as exc:
+            raise SchemaError(str(exc)) from exc
+    elif disease == "heart":
+        data = map_heart_labels(data)
+
+    try:
+        data = data.astype(float)
+    except (TypeError, ValueError):
+        data = data.apply(pd.to_numeric, errors="coerce")
+    # NaN and +/-inf alike (JSON Infinity, "inf" in a CSV) are rejected.
+    bad_rows = data.index[~np.isfinite(data.to_numpy()).all(axis=1)]
+    if len(bad_rows):
+        shown = ", ".join(str(i) for i in bad_rows[:10])
+        raise SchemaError(f"Missing, non-numeric or infinite values in {len(bad_rows)} row(s), e.g. rows {shown}")
+    return data
+
+
+def map_heart_labels(data):
+    # Replaces the heart page's selectbox labels ("Asymptomatic (3)") with their
+    # codes; numeric columns are left alone and unknown labels become NaN.
+    mapped = {}
+    for col, lookup in HEART_LOOKUP.items():
+        values = data[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            codes = values.astype(str).str.strip().str.lower().map(lookup)
+            mapped[col] = codes.fillna(pd.to_numeric(values, errors="coerce"))
+    return data.assign(**mapped) if mapped else data
+
+
+def predict_proba(disease, features, pool=None):
+    # pool is an optional worker_pool.WorkerPool to spread the rows over.
+    drift.observe(disease, features.to_numpy())
+    if pool is not None:
+        return pool.predict(disease, features.to_numpy())
+    return get_model(disease).predict_proba(features)[:, 1]
+
+
+def risk_fields(disease, proba):
+    # Calibrated probability, 0-100 score and the disease's high-risk flag
+    # for one raw predict_proba value.
+    calibration = get_calibration(disease)
+    proba = float(calibration.apply(proba))
+    return {"probability": proba, "risk_score": int(proba * 100), "high_risk": proba >= calibration.threshold}
+
+
+def score_frame(disease, df, pool=None):
+    # Returns the input rows with probability, risk_score and high_risk appended.
+    calibration = get_calibration(disease)
+    proba = calibration.apply(predict_proba(disease, prepare_features(disease, df), pool))
+    risk_score = (proba * 100).astype(int)
+    return df.assign(probability=proba, risk_score=risk_score, high_risk=proba >= calibration.threshold)
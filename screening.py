@@ -0,0 +1,52 @@
+# Screens one patient for every condition in a single call. The patient
+# record uses each model's own feature names, plus a few shared fields that
+# are entered once and fed to every model that takes them. The four
+# predictions run concurrently and come back as one report.
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from prediction_cache import cached_predict_proba
+from schemas import MODELS, input_columns
+from scoring import SchemaError, prepare_features, risk_fields
+
+# Shared patient fields and the feature each model reads them as.
+SHARED_FIELDS = {
+    "age": {"diabetes": "Age", "kidney": "age", "heart": "age"},
+    "blood_pressure": {"diabetes": "BloodPressure", "kidney": "bp"},
+    "glucose": {"diabetes": "Glucose", "kidney": "bgr"},
+}
+
+_executor = ThreadPoolExecutor(max_workers=len(MODELS), thread_name_prefix="screening")
+
+
+def model_record(disease, patient):
+    # The subset of patient that disease's model reads, under its feature names.
+    record = {col: patient[col] for col in input_columns(disease) if col in patient}
+    for field, targets in SHARED_FIELDS.items():
+        if disease in targets and field in patient:
+            record.setdefault(targets[disease], patient[field])
+    return record
+
+
+def screen_disease(disease, patient, predict=None):
+    record = model_record(disease, patient)
+    missing = [col for col in input_columns(disease) if record.get(col) is None]
+    if missing:
+        return {"status": "skipped", "missing": missing}
+    try:
+        features = prepare_features(disease, pd.DataFrame([record]))
+    except SchemaError as exc:
+        return {"status": "error", "error": str(exc)}
+    proba = cached_predict_proba(disease, features.to_dict("records")[0], predict)
+    return {"status": "scored", **risk_fields(disease, proba)}
+
+
+def screen(patient, diseases=None, batcher=None):
+    # Returns {disease: result}; diseases whose fields are missing are reported
+    # as skipped rather than failing the whole screen.
+    futures = {}
+    for disease in diseases or MODELS:
+        predict = (lambda row, disease=disease: batcher.predict(disease, row)) if batcher is not None else None
+        futures[disease] = _executor.submit(screen_disease, disease, patient, predict)
+    return {disease: future.result() for disease, future in futures.items()}
@@ -0,0 +1,143 @@
+# Cross-validated hyperparameter search for train.py --search. Random Forest,
+# XGBoost and SVM are tuned with successive halving: every grid point starts
+# on a small resource budget (few trees for the ensembles, a subsample of
+# rows for SVM) and only the best third is promoted to the next round, so
+# weak settings are stopped early. The remaining candidates are scored with
+# plain k-fold CV.
+#
+# The wall-clock budget is checked before each candidate model and before
+# each halving round. A search that runs out keeps the best setting of its
+# last finished round, so the budget can be overrun by at most one round
+# (plus the final refit), not by a whole search.
+import math
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, cross_val_score
+
+from train import candidate_models
+from training_data import RANDOM_STATE, load_split
+
+DEFAULT_FOLDS = 5
+
+SEARCH_SPACES = {
+    "Random Forest": {
+        "max_depth": [None, 6, 12],
+        "min_samples_leaf": [1, 3],
+        "max_features": ["sqrt", 0.5],
+    },
+    "XGBoost": {
+        "max_depth": [2, 3, 5],
+        "learning_rate": [0.05, 0.1, 0.3],
+        "subsample": [0.8, 1.0],
+    },
+    "SVM": {
+        "C": [0.1, 1, 10, 100],
+        "gamma": ["scale", 0.001, 0.01, 0.1],
+    },
+}
+
+# Resource each search halves over: (parameter, min_resources, max_resources).
+# For n_samples the rounds end on the full training folds.
+HALVING_RESOURCES = {
+    "Random Forest": ("n_estimators", 20, 180),
+    "XGBoost": ("n_estimators", 20, 180),
+    "SVM": ("n_samples", None, None),
+}
+HALVING_FACTOR = 3
+
+# Cheapest first, so a tight budget still covers as many candidates as possible.
+SEARCH_ORDER = ["Logistic Regression", "KNN", "SVM", "XGBoost", "Random Forest"]
+
+
+def _past(deadline):
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def _halving_rounds(resource, min_resources, max_resources, n_candidates):
+    # Resource per round, as HalvingGridSearchCV schedules it: enough rounds
+    # to narrow the grid to one setting, min_resources growing by the factor.
+    rounds = 1 + int(math.log(n_candidates, HALVING_FACTOR) + 1e-9)
+    if resource == "n_samples":
+        return [1 / HALVING_FACTOR ** (rounds - 1 - i) for i in range(rounds)]
+    rounds = min(rounds, 1 + int(math.log(max_resources / min_resources, HALVING_FACTOR) + 1e-9))
+    return [min_resources * HALVING_FACTOR ** i for i in range(rounds)]
+
+
+def halving_search(name, model, X, y, cv, n_jobs=-1, deadline=None):
+    # Successive halving over SEARCH_SPACES[name]. Returns (refit model,
+    # cv ROC AUC, best params, rounds finished, rounds planned); rounds
+    # starting after the deadline are skipped.
+    resource, min_resources, max_resources = HALVING_RESOURCES[name]
+    candidates = list(ParameterGrid(SEARCH_SPACES[name]))
+    rounds = _halving_rounds(resource, min_resources, max_resources, len(candidates))
+    splits = list(cv.split(X, y))
+    rng = np.random.RandomState(RANDOM_STATE)
+    for i, amount in enumerate(rounds):
+        if i and _past(deadline):
+            break
+        if resource == "n_samples":
+            # Subsample the training folds; every round is scored on whole test folds.
+            round_splits = [(rng.choice(train, max(int(len(train) * amount), 2), replace=False), test) for train, test in splits]
+            round_params = candidates
+        else:
+            round_splits = splits
+            round_params = [{**params, resource: amount} for params in candidates]
+        fold_scores = Parallel(n_jobs=n_jobs)(
+            delayed(cross_val_score)(clone(model).set_params(**params), X, y, cv=round_splits, scoring="roc_auc", error_score=np.nan)
+            for params in round_params
+        )
+        scores = np.nan_to_num([np.mean(candidate) for candidate in fold_scores], nan=-np.inf)
+        order = np.argsort(-scores, kind="stable")
+        finished, best_score, best_params = i + 1, float(scores[order[0]]), round_params[order[0]]
+        candidates = [candidates[j] for j in order[:math.ceil(len(candidates) / HALVING_FACTOR)]]
+    best = clone(model).set_params(**best_params).fit(X, y)
+    return best, best_score, best_params, finished, len(rounds)
+
+
+def search_disease(disease, folds=DEFAULT_FOLDS, n_jobs=-1, deadline=None):
+    X_train, X_test, y_train, y_test = load_split(disease)
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE)
+    models = candidate_models()
+
+    results = {}
+    for name in SEARCH_ORDER:
+        # Always evaluate at least the cheapest candidate so every disease gets a model.
+        if results and _past(deadline):
+            break
+        start = time.perf_counter()
+        model = models[name]
+        extra = {}
+        if name in SEARCH_SPACES:
+            model, cv_roc_auc, best_params, finished, planned = halving_search(name, model, X_train, y_train, cv, n_jobs, deadline)
+            extra["halving_rounds"] = f"{finished}/{planned}"
+        else:
+            cv_roc_auc = cross_val_score(model, X_train, y_train, cv=cv, scoring="roc_auc", n_jobs=n_jobs).mean()
+            model = clone(model).fit(X_train, y_train)
+            best_params = {}
+
+        proba = model.predict_proba(X_test)[:, 1]
+        results[name] = (model, {
+            "accuracy": accuracy_score(y_test, (proba >= 0.5).astype(int)),
+            "roc_auc": roc_auc_score(y_test, proba),
+            "cv_roc_auc": float(cv_roc_auc),
+            "best_params": best_params,
+            **extra,
+            "fit_seconds": time.perf_counter() - start,
+        })
+    return results
+
+
+def search_all(diseases, folds=DEFAULT_FOLDS, n_jobs=-1, budget=None):
+    # Diseases share the budget; each gets an equal slice of what remains.
+    results = {}
+    end = None if budget is None else time.monotonic() + budget
+    for i, disease in enumerate(diseases):
+        deadline = None
+        if end is not None:
+            deadline = time.monotonic() + (end - time.monotonic()) / (len(diseases) - i)
+        results[disease] = search_disease(disease, folds, n_jobs, deadline)
+    return results
@@ -1,16 +1,30 @@
 import streamlit as st
+import drift
+import hot_reload
+import instrumentation
 import home
 import diabetes
 import kidney_disease
 import heart_disease
 import breast_cancer
+import batch_scoring
+import full_screening
+import cohort_analytics
+from schemas import MODELS
 
 st.set_page_config(page_title="Chronic Disease Prediction", layout="wide")
 
+# Swap in retrained models in the background without restarting the server
+hot_reload.start()
+
 # Initialize session state for page navigation
 if "page" not in st.session_state:
     st.session_state["page"] = "Home"
 
+# Per-session stage counters, kept alongside the process-wide histograms
+if instrumentation.ENABLED:
+    instrumentation.bind_session(st.session_state.setdefault("metrics", {}))
+
 # Sidebar navigation buttons
 with st.sidebar:
     if st.button("Home"):
@@ -23,6 +37,20 @@ with st.sidebar:
         st.session_state["page"] = "Heart Disease"
     if st.button("Breast Cancer"):
         st.session_state["page"] = "Breast Cancer"
+    if st.button("Full Screening"):
+        st.session_state["page"] = "Full Screening"
+    if st.button("Batch Scoring"):
+        st.session_state["page"] = "Batch Scoring"
+    if st.button("Cohort Analytics"):
+        st.session_state["page"] = "Cohort Analytics"
+    drift_panel = st.container()
+    if instrumentation.ENABLED:
+        metrics_panel = st.container()
+
+# Results are kept in session state until the user leaves the page
+if st.session_state.get("results_page") != st.session_state["page"]:
+    st.session_state["results_page"] = st.session_state["page"]
+    st.session_state["results"] = {}
 
 if st.session_state["page"] == "Home":
     home.show()
@@ -34,3 +62,23 @@ elif st.session_state["page"] == "Heart Disease":
     heart_disease.show()
 elif st.session_state["page"] == "Breast Cancer":
     breast_cancer.show()
+elif st.session_state["page"] == "Full Screening":
+    full_screening.show()
+elif st.session_state["page"] == "Batch Scoring":
+    batch_scoring.show()
+elif st.session_state["page"] == "Cohort Analytics":
+    cohort_analytics.show()
+
+# Inputs where recent patients no longer look like the training data
+drift_alerts = drift.alerts()
+if drift_alerts:
+    drift_panel.warning(
+        "Input drift: "
+        + "; ".join(f"{MODELS[disease]['label']} ({', '.join(features)})" for disease, features in drift_alerts.items())
+    )
+
+if instrumentation.ENABLED:
+    # Filled after the page runs so the counts include this rerun
+    with metrics_panel.expander("Session metrics"):
+        st.json(st.session_state["metrics"])
+    instrumentation.export()
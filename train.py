@@ -0,0 +1,253 @@
+# Scripted replacement for models/*_model_comparison.ipynb. Trains every
+# candidate model for every dataset in parallel, records metrics and wall
+# time per candidate, and writes the winners as a versioned artifact set:
+#
+#   artifacts/<version>/best_*_model.pkl
+#   artifacts/<version>/manifest.json
+#
+# Run `python train.py --publish` to also copy the winners to the repo root,
+# where the Streamlit pages load them from. `--search` swaps the single
+# default-hyperparameter fit for a cross-validated search (see search.py).
+#
+# Every candidate is also benchmarked (single-row and 1k-row predict_proba,
+# pickle size, unpickle time) in the compact form it would be served in.
+# The winner is the fastest candidate whose ROC AUC is within
+# --auc-tolerance of the best one; it is exported via compact.compact_model
+# (behind the imputer fitted on the training split, for datasets with gaps)
+# and the raw estimator is kept next to it under raw/. Its calibration map and
+# high-risk cutoff (see calibration.py) are fitted on the holdout split and
+# recorded in the manifest; --publish adds them to calibration.json.
+import argparse
+import json
+import os
+import pickle
+import shutil
+import statistics
+import time
+from datetime import datetime, timezone
+
+import joblib
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.svm import SVC
+
+from calibration import DEFAULT_SENSITIVITY, calibrate, write_maps
+from compact import compact_model, dump_mmap
+from model_registry import file_digest
+from schemas import MODELS
+from training_data import RANDOM_STATE, load_imputer, load_split
+
+ARTIFACTS_DIR = "artifacts"
+DEFAULT_AUC_TOLERANCE = 0.005
+
+
+def candidate_models():
+    from xgboost import XGBClassifier
+
+    return {
+        "Random Forest": RandomForestClassifier(random_state=RANDOM_STATE),
+        "Logistic Regression": LogisticRegression(max_iter=1000),
+        "SVM": SVC(probability=True),
+        "KNN": KNeighborsClassifier(),
+        "XGBoost": XGBClassifier(eval_metric="logloss", n_jobs=1),
+    }
+
+
+def fit_candidate(disease, name, model):
+    X_train, X_test, y_train, y_test = load_split(disease)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    proba = model.predict_proba(X_test)[:, 1]
+    metrics = {
+        "accuracy": accuracy_score(y_test, (proba >= 0.5).astype(int)),
+        "roc_auc": roc_auc_score(y_test, proba),
+        "fit_seconds": fit_seconds,
+    }
+    return disease, name, model, metrics
+
+
+def train_all(diseases, n_jobs=-1):
+    for disease in diseases:
+        load_split(disease)  # warm the cache once before the workers fan out
+
+    jobs = [
+        delayed(fit_candidate)(disease, name, model)
+        for disease in diseases
+        for name, model in candidate_models().items()
+    ]
+    results = {}
+    for disease, name, model, metrics in Parallel(n_jobs=n_jobs)(jobs):
+        results.setdefault(disease, {})[name] = (model, metrics)
+    return results
+
+
+def _median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def benchmark_candidate(disease, model):
+    X_test = load_split(disease)[1]
+    served = compact_model(model, load_imputer(disease))
+    blob = pickle.dumps(served)
+    one_row = X_test.iloc[:1]
+    rows_1k = pd.concat([X_test] * (1000 // len(X_test) + 1), ignore_index=True).iloc[:1000]
+
+    served.predict_proba(one_row)  # warm-up
+    return {
+        "format": type(served).__name__,
+        "size_bytes": len(blob),
+        "unpickle_ms": _median_ms(lambda: pickle.loads(blob), 5),
+        "single_row_ms": _median_ms(lambda: served.predict_proba(one_row), 50),
+        "batch_1k_ms": _median_ms(lambda: served.predict_proba(rows_1k), 5),
+    }
+
+
+def benchmark_all(results):
+    # Run after training, one candidate at a time, so timings aren't skewed
+    # by parallel fits competing for the same cores.
+    for disease, candidates in results.items():
+        for model, metrics in candidates.values():
+            metrics.update(benchmark_candidate(disease, model))
+
+
+def select_best(candidates, auc_tolerance=DEFAULT_AUC_TOLERANCE):
+    # Prefer the cross-validated score when the candidates came from a search.
+    def score(name):
+        metrics = candidates[name][1]
+        return metrics.get("cv_roc_auc", metrics["roc_auc"])
+
+    top = max(score(name) for name in candidates)
+    eligible = [name for name in candidates if score(name) >= top - auc_tolerance]
+    return min(eligible, key=lambda name: candidates[name][1].get("single_row_ms", 0.0))
+
+
+def write_artifacts(results, version, wall_seconds, auc_tolerance=DEFAULT_AUC_TOLERANCE, sensitivity=DEFAULT_SENSITIVITY):
+    out_dir = os.path.join(ARTIFACTS_DIR, version)
+    os.makedirs(os.path.join(out_dir, "raw"), exist_ok=True)
+    manifest = {
+        "version": version,
+        "wall_seconds": wall_seconds,
+        "auc_tolerance": auc_tolerance,
+        "sensitivity": sensitivity,
+        "models": {},
+    }
+    for disease, candidates in results.items():
+        best = select_best(candidates, auc_tolerance)
+        model = candidates[best][0]
+        name = os.path.basename(MODELS[disease]["path"])
+        path = os.path.join(out_dir, name)
+        imputer = load_imputer(disease)
+        dump_mmap(model, path, imputer)
+        joblib.dump(model, os.path.join(out_dir, "raw", name))
+        calibration, holdout = calibrate(disease, model, sensitivity)
+        manifest["models"][disease] = {
+            "best": best,
+            "artifact": name,
+            "raw_artifact": os.path.join("raw", name),
+            "sha256": file_digest(path),
+            "preprocessing": imputer.to_dict() if imputer is not None else None,
+            "calibration": calibration.to_dict(),
+            "calibration_holdout": holdout,
+            "candidates": {name: metrics for name, (_, metrics) in candidates.items()},
+        }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return out_dir, manifest
+
+
+def publish(out_dir, manifest):
+    # Calibration maps go in first, keyed by checksum, so each new model finds
+    # its map the moment it is swapped in; the current models keep theirs.
+    current = {file_digest(config["path"]) for config in MODELS.values() if os.path.exists(config["path"])}
+    write_maps(
+        {
+            entry["sha256"]: {"disease": disease, "calibration": entry["calibration"], "holdout": entry["calibration_holdout"]}
+            for disease, entry in manifest["models"].items()
+        },
+        keep=current,
+    )
+    # Copy to a temp name first so the app never sees a half-written pickle.
+    # The raw estimator goes next to it as the *.pkl.sklearn backup that
+    # compact.py keeps, so the pair never falls out of step.
+    for disease, entry in manifest["models"].items():
+        dest = MODELS[disease]["path"]
+        for source, target in ((entry["raw_artifact"], dest + ".sklearn"), (entry["artifact"], dest)):
+            shutil.copyfile(os.path.join(out_dir, source), target + ".tmp")
+            os.replace(target + ".tmp", target)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and compare candidate models for each disease.")
+    parser.add_argument("diseases", nargs="*", help=f"any of {', '.join(MODELS)} (defaults to all four)")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel workers (-1 uses every core)")
+    parser.add_argument("--version", help="artifact version, defaults to a UTC timestamp")
+    parser.add_argument("--publish", action="store_true", help="copy the winners to the repo root")
+    parser.add_argument("--search", action="store_true", help="tune hyperparameters with k-fold successive halving")
+    parser.add_argument("--folds", type=int, default=5, help="CV folds for --search")
+    parser.add_argument("--budget", type=float, help="wall-clock limit in seconds for --search")
+    parser.add_argument(
+        "--auc-tolerance",
+        type=float,
+        default=DEFAULT_AUC_TOLERANCE,
+        help="pick the fastest candidate within this much ROC AUC of the best (0 = most accurate wins)",
+    )
+    parser.add_argument(
+        "--sensitivity",
+        type=float,
+        default=DEFAULT_SENSITIVITY,
+        help="share of holdout positives each high-risk cutoff must flag",
+    )
+    args = parser.parse_args(argv)
+
+    unknown = [disease for disease in args.diseases if disease not in MODELS]
+    if unknown:
+        parser.error(f"unknown disease(s): {', '.join(unknown)}")
+    diseases = args.diseases or list(MODELS)
+    version = args.version or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    start = time.perf_counter()
+    if args.search:
+        from search import search_all
+
+        results = search_all(diseases, args.folds, args.jobs, args.budget)
+    else:
+        results = train_all(diseases, args.jobs)
+    wall_seconds = time.perf_counter() - start
+    benchmark_all(results)
+    out_dir, manifest = write_artifacts(results, version, wall_seconds, args.auc_tolerance, args.sensitivity)
+
+    for disease, entry in manifest["models"].items():
+        print(f"\n{MODELS[disease]['label']}")
+        for name, metrics in entry["candidates"].items():
+            marker = "*" if name == entry["best"] else " "
+            cv = f"  cv auc {metrics['cv_roc_auc']:.4f}" if "cv_roc_auc" in metrics else ""
+            print(
+                f" {marker} {name:<20} acc {metrics['accuracy']:.4f}  "
+                f"auc {metrics['roc_auc']:.4f}{cv}  fit {metrics['fit_seconds']:.2f}s  "
+                f"1 row {metrics['single_row_ms']:.3f}ms  1k rows {metrics['batch_1k_ms']:.2f}ms  "
+                f"{metrics['size_bytes'] / 1024:.0f} KB"
+            )
+        holdout = entry["calibration_holdout"]
+        print(
+            f"   {entry['calibration']['method']} calibration, high-risk cutoff {entry['calibration']['threshold']:.3f}: "
+            f"sensitivity {holdout['sensitivity']:.3f}  specificity {holdout['specificity']:.3f}"
+        )
+    print(f"\nTrained in {wall_seconds:.1f}s -> {out_dir}")
+
+    if args.publish:
+        publish(out_dir, manifest)
+        print("Published to " + ", ".join(MODELS[d]["path"] for d in manifest["models"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# The bundled datasets as the models see them, shared by train.py and the
+# runtime modules that need reference rows (explanations, the hot-reload
+# smoke test, calibration, risk grids, drift references), so those don't
+# import the training code. Splits and the imputer fitted on them are cached
+# in .cache/ keyed by the CSV's checksum and by CODE_VERSION, a checksum of
+# the modules that shape them, so editing the schema, the encoding or the
+# imputer rebuilds them.
+import hashlib
+import os
+
+import pandas as pd
+from joblib import Memory
+from sklearn.model_selection import train_test_split
+
+from kidney_encoding import encode_kidney_frame
+from model_registry import file_digest
+from preprocessing import fit_imputer
+from schemas import KIDNEY_CATEGORICAL_COLS, MODELS
+
+CACHE_DIR = ".cache"
+RANDOM_STATE = 42
+TEST_SIZE = 0.2
+
+DATASETS = {
+    "diabetes": {"csv": "data/diabetes.csv", "target": "Outcome"},
+    "kidney": {"csv": "data/kidney_disease.csv", "target": "classification"},
+    "heart": {"csv": "data/heart.csv", "target": "output"},
+    "breast_cancer": {"csv": "data/Breast_cancer_data.csv", "target": "diagnosis"},
+}
+
+CODE_MODULES = ["schemas.py", "kidney_encoding.py", "preprocessing.py", "training_data.py"]
+
+memory = Memory(CACHE_DIR, verbose=0)
+
+
+def _code_version():
+    digest = hashlib.sha256()
+    for name in CODE_MODULES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+CODE_VERSION = _code_version()
+
+
+def load_frame(disease):
+    # Cleaned CSV rows with categorical values left as strings. Kidney rows
+    # keep their gaps (NaN) for the imputer instead of being dropped.
+    config = DATASETS[disease]
+    df = pd.read_csv(config["csv"])
+    if disease == "kidney":
+        # Strip stray whitespace; "?" in the numeric columns means missing.
+        df = df.map(lambda x: x.strip() if isinstance(x, str) else x)
+        df = df.dropna(subset=[config["target"]])
+        numeric = [col for col in MODELS[disease]["features"] if col not in KIDNEY_CATEGORICAL_COLS]
+        df[numeric] = df[numeric].apply(pd.to_numeric, errors="coerce")
+        df[config["target"]] = df[config["target"]].map({"ckd": 1, "notckd": 0})
+    return df
+
+
+def load_dataset(disease, impute=True):
+    # Encoded features and labels. Gaps are filled by the imputer fitted on
+    # the training split, unless impute is False.
+    df = load_frame(disease)
+    if disease == "kidney":
+        df = encode_kidney_frame(df, allow_missing=True)
+    X = df[MODELS[disease]["features"]].astype(float)
+    y = df[DATASETS[disease]["target"]].astype(int)
+    imputer = load_imputer(disease) if impute else None
+    return (imputer.transform_frame(X) if imputer is not None else X), y
+
+
+@memory.cache
+def _cached_split(disease, csv_digest, code_version):
+    # csv_digest and code_version are only part of the cache key, so an
+    # edited CSV or preprocessing change is re-read.
+    X, y = load_dataset(disease, impute=False)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    imputer = fit_imputer(disease, X_train)
+    if imputer is not None:
+        X_train, X_test = imputer.transform_frame(X_train), imputer.transform_frame(X_test)
+    return X_train, X_test, y_train, y_test, imputer
+
+
+def _split(disease):
+    return _cached_split(disease, file_digest(DATASETS[disease]["csv"]), CODE_VERSION)
+
+
+def load_split(disease):
+    # Train/test rows with gaps already filled.
+    return _split(disease)[:4]
+
+
+def load_imputer(disease):
+    # The preprocessing.Imputer fitted on the training split (None when the
+    # data has no gaps); published models carry it.
+    return _split(disease)[4]
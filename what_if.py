@@ -0,0 +1,58 @@
+# What-if explorer shown under the heart and breast cancer results: sweep one
+# input across its range with the others held at the patient's values. The
+# curve comes from the precomputed risk grid (risk_grid.py) when one was
+# saved for the loaded model, else from the model itself, and is then
+# calibrated like the score. It runs as a fragment, so moving the slider
+# reruns only the explorer.
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from calibration import calibrated_proba
+from fast_path import get_predictor
+from risk_grid import GRID_AXES, get_grid
+from schemas import MODELS
+
+CURVE_POINTS = 200
+
+
+def estimate(disease, X):
+    # Calibrated probabilities for the rows of X, and the grid if any came from it.
+    grid = get_grid(disease)
+    proba = grid.lookup(X) if grid is not None else np.full(len(X), np.nan)
+    off_grid = np.isnan(proba)
+    if off_grid.any():
+        proba[off_grid] = get_predictor(disease).predict(X[off_grid])
+    return calibrated_proba(disease, proba), grid if not off_grid.all() else None
+
+
+def risk_curve(disease, record, feature, low, high, value):
+    # Sweep of feature from low to high; the last row is the slider's value.
+    features = MODELS[disease]["features"]
+    X = np.tile(np.array([record[f] for f in features], dtype=np.float64), (CURVE_POINTS + 1, 1))
+    X[:, features.index(feature)] = np.append(np.linspace(low, high, CURVE_POINTS), value)
+    proba, grid = estimate(disease, X)
+    return X[:-1, features.index(feature)], proba[:-1], float(proba[-1]), grid
+
+
+@st.fragment
+def show(disease, record):
+    sliders = {feature: spec for feature, spec in GRID_AXES[disease].items() if isinstance(spec, tuple)}
+    st.markdown("### What If")
+    feature = st.selectbox("Input to vary", options=list(sliders), key=f"what_if_feature_{disease}")
+    _, low, high = sliders[feature]
+    value = st.slider(
+        feature,
+        min_value=float(low),
+        max_value=float(high),
+        value=float(np.clip(record[feature], low, high)),
+        key=f"what_if_value_{disease}_{feature}",
+    )
+
+    values, proba, score, grid = risk_curve(disease, record, feature, low, high, value)
+    st.metric(label=f"Estimated score at {feature} = {value:g}", value=f"{int(score * 100)}%")
+    st.line_chart(pd.DataFrame({"risk": proba * 100}, index=pd.Index(values, name=feature)))
+    if grid is not None:
+        st.caption(f"From the precomputed risk grid (within {grid.max_error * 100:.2f} points of the model).")
+    else:
+        st.caption("Scored by the model.")
@@ -0,0 +1,65 @@
+# Process-pool inference for CPU-bound scoring. predict_proba on the forest
+# and SVC models holds the GIL, so threads in one process top out at a single
+# core. The pool loads every model in the parent before starting its workers;
+# with the fork start method the workers inherit those arrays copy-on-write
+# instead of unpickling private copies. Elsewhere each worker loads through
+# the registry in its initializer. Workers keep the models they started with,
+# so restart the pool after publishing new artifacts.
+import gc
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from model_registry import get_model
+from schemas import MODELS
+
+# Smallest block worth the round trip to a worker process.
+MIN_ROWS_PER_TASK = 1024
+
+
+def _warm(diseases):
+    for disease in diseases:
+        get_model(disease)
+    return os.getpid()
+
+
+def _predict(disease, X):
+    # Same call as scoring.predict_proba, so pooled and in-process scores match.
+    features = pd.DataFrame(X, columns=MODELS[disease]["features"])
+    return get_model(disease).predict_proba(features)[:, 1]
+
+
+class WorkerPool:
+    def __init__(self, workers=None, diseases=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.diseases = list(diseases or MODELS)
+        if "fork" in multiprocessing.get_all_start_methods():
+            _warm(self.diseases)
+            # Keep the collector from touching (and so copying) the inherited objects.
+            gc.freeze()
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        self._executor = ProcessPoolExecutor(
+            self.workers, mp_context=context, initializer=_warm, initargs=(self.diseases,)
+        )
+        # Start every worker now, before the caller spins up its own threads.
+        self.pids = sorted(set(self._executor.map(_warm, [[]] * self.workers)))
+
+    def submit(self, disease, X):
+        # Future resolving to positive-class probabilities for one block of rows.
+        return self._executor.submit(_predict, disease, np.asarray(X, dtype=np.float64))
+
+    def predict(self, disease, X):
+        X = np.asarray(X, dtype=np.float64)
+        blocks = min(self.workers, len(X) // MIN_ROWS_PER_TASK)
+        if blocks <= 1:
+            return self.submit(disease, X).result()
+        parts = self._executor.map(_predict, [disease] * blocks, np.array_split(X, blocks))
+        return np.concatenate(list(parts))
+
+    def close(self):
+        self._executor.shutdown()